@@ -1,6 +1,16 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from routers import validate, chatbot, ocr
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from routers import validate, chatbot, ocr, documents
+from config import get_settings
+from services.admission import admission_controller, AdmissionRejected
+from services.llm_client import get_llm_client
+from services.loop_monitor import get_loop_monitor, start_loop_monitor
+from services.profiling import profile_request
+from services.result_cache import get_result_cache
+from services.warmup import warm_up, warmup_state
+import asyncio
 import os
 
 app = FastAPI(
@@ -24,10 +34,66 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+settings = get_settings()
+
+async def profile_requests(request: Request, call_next):
+    """
+    Profile a request's pipeline when asked to with X-Profile: 1 or ?profile=1,
+    and keep the profile of any request slower than PROFILE_SLOW_SECONDS.
+    """
+    requested = settings.profiling_enabled and (
+        request.headers.get("x-profile") == "1" or request.query_params.get("profile") == "1"
+    )
+    if not requested and settings.profile_slow_seconds <= 0:
+        return await call_next(request)
+
+    with profile_request(f"{request.method} {request.url.path}") as profile:
+        response = await call_next(request)
+
+    slow = settings.profile_slow_seconds > 0 and profile.wall_seconds >= settings.profile_slow_seconds
+    if requested or (slow and profile.stages):
+        try:
+            await run_in_threadpool(profile.write, settings.profile_dir)
+            response.headers["X-Profile-Id"] = profile.profile_id
+            if slow and not requested:
+                print(f"Slow request {profile.label} took {profile.wall_seconds:.1f}s, "
+                      f"profile saved as {profile.profile_id}")
+        except Exception as e:
+            print(f"Warning: could not write profile {profile.profile_id}: {e}")
+    if profile.stages:
+        response.headers["Server-Timing"] = profile.server_timing()
+    return response
+
+if settings.profiling_enabled or settings.profile_slow_seconds > 0:
+    app.middleware("http")(profile_requests)
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.detail, "stage": exc.stage},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+@app.on_event("startup")
+async def start_warm_up():
+    # Warm up in the background so /ready can report progress meanwhile
+    loop = asyncio.get_running_loop()
+    app.state.warm_up = loop.run_in_executor(None, warm_up)
+
+    start_loop_monitor(settings.loop_monitor_mode, settings.loop_monitor_interval, settings.loop_block_threshold)
+
+@app.on_event("shutdown")
+async def stop_loop_monitor():
+    monitor = get_loop_monitor()
+    if monitor is not None:
+        monitor.stop()
+
 # Include routers
 app.include_router(validate.router, prefix="/validate", tags=["PDF Validation"])
 app.include_router(chatbot.router, prefix="/summarize", tags=["Summarization"])
 app.include_router(ocr.router, prefix="/ocr", tags=["OCR Processing"])
+app.include_router(documents.router, prefix="/documents", tags=["Document Store"])
 
 @app.get("/")
 def root():
@@ -37,7 +103,30 @@ def root():
             "pdf_extraction": "/validate/pdf",
             "ocr_extraction": "/ocr/extract",
             "supported_languages": "/ocr/languages",
+            "document_search": "/documents/search",
+            "document_retrieval": "/documents/{document_hash}",
             "summarization": "/summarize/summarize",
-            "health": "/summarize/health"
+            "health": "/summarize/health",
+            "metrics": "/metrics",
+            "readiness": "/ready"
         }
     }
+
+@app.get("/ready")
+async def ready():
+    """Readiness probe: succeeds only once this worker has finished warming up"""
+    if not warmup_state["ready"]:
+        return JSONResponse(status_code=503, content={"status": "warming_up"})
+    return {"status": "ready", "pid": os.getpid(), **warmup_state}
+
+@app.get("/metrics")
+def metrics():
+    """Admission control queue depths, in-flight work, rejection counts, LLM client health and event-loop lag"""
+    cache = get_result_cache()
+    monitor = get_loop_monitor()
+    return {
+        "admission": admission_controller.metrics(),
+        "result_cache": cache.metrics() if cache is not None else None,
+        "llm_client": get_llm_client().metrics(),
+        "event_loop": monitor.metrics() if monitor is not None else None
+    }
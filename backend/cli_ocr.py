@@ -6,27 +6,60 @@ Command-line interface for DocuMend's OCR functionality.
 
 import argparse
 import json
+import os
 import sys
 import asyncio
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Union
 
-# Import the OCR service
-try:
-    from services.ocr_service import OCRService
-except ImportError:
-    print("Error: This CLI tool should be run from the backend directory.")
-    print("Usage: cd backend && python cli_ocr.py [options]")
-    sys.exit(1)
+
+def load_ocr_service():
+    """Import the OCR service on demand so --help and --version stay instant."""
+    try:
+        from services.ocr_service import OCRService
+    except ImportError:
+        print("Error: This CLI tool should be run from the backend directory.")
+        print("Usage: cd backend && python cli_ocr.py [options]")
+        sys.exit(1)
+    return OCRService
+
+
+async def run_pipeline(ocr_service, file_path: str, file_extension: str, detect_key_values: bool, clean_text: bool) -> dict:
+    if file_extension == '.pdf':
+        return await ocr_service.process_pdf(file_path, detect_key_values, clean_text)
+    return await ocr_service.process_image(file_path, detect_key_values, clean_text)
+
+
+async def profile_file(ocr_service, file_path: str, file_extension: str, detect_key_values: bool, clean_text: bool) -> dict:
+    """Run the pipeline under the sampling profiler and save a flamegraph and summary."""
+    from config import get_settings
+    from services.profiling import profile_request
+
+    with profile_request(f"cli {Path(file_path).name}") as profile:
+        result = await run_pipeline(ocr_service, file_path, file_extension, detect_key_values, clean_text)
+
+    paths = profile.write(get_settings().profile_dir)
+    summary = profile.summary()
+    print(f"⏱️  Profile: {summary['wall_seconds']}s wall, {summary['samples']} samples")
+    for name, timing in summary["stages"].items():
+        print(f"   {name:<16}{timing['seconds']:>9.3f}s  ({timing['calls']} call(s))")
+    print(f"   Flamegraph: {paths['flamegraph']}")
+    print(f"   Summary:    {paths['summary']}")
+    print("-" * 50)
+    return result
 
 
 async def process_file(
     file_path: str,
     output_path: Optional[str] = None,
-    language: str = "eng",
+    language: str = "auto",
     detect_key_values: bool = True,
     clean_text: bool = True,
-    format_output: str = "json"
+    format_output: str = "json",
+    dpi: Optional[str] = None,
+    raster_threads: Optional[int] = None,
+    grayscale: Union[str, bool, None] = None,
+    profile: bool = False
 ) -> dict:
     """Process a file and return OCR results."""
     
@@ -35,7 +68,8 @@ async def process_file(
         raise FileNotFoundError(f"File not found: {file_path}")
     
     # Initialize OCR service
-    ocr_service = OCRService(language=language)
+    OCRService = load_ocr_service()
+    ocr_service = OCRService(language=language, dpi=dpi, raster_threads=raster_threads, grayscale=grayscale)
     
     # Determine file type
     file_extension = Path(file_path).suffix.lower()
@@ -44,15 +78,20 @@ async def process_file(
     print(f"Language: {language}")
     print(f"Key-value detection: {'ON' if detect_key_values else 'OFF'}")
     print(f"Text cleaning: {'ON' if clean_text else 'OFF'}")
+    if file_extension == '.pdf':
+        print(f"Rasterization: {ocr_service.engine.dpi} DPI, "
+              f"{ocr_service.engine.raster_threads} thread(s), "
+              f"{ {True: 'grayscale', False: 'color'}.get(ocr_service.engine.grayscale, 'grayscale or color per page')}")
     print("-" * 50)
     
     try:
-        if file_extension == '.pdf':
-            result = await ocr_service.process_pdf(file_path, detect_key_values, clean_text)
-        elif file_extension in ['.jpg', '.jpeg', '.png']:
-            result = await ocr_service.process_image(file_path, detect_key_values, clean_text)
-        else:
+        if file_extension not in ['.pdf', '.jpg', '.jpeg', '.png']:
             raise ValueError(f"Unsupported file type: {file_extension}")
+
+        if profile:
+            result = await profile_file(ocr_service, file_path, file_extension, detect_key_values, clean_text)
+        else:
+            result = await run_pipeline(ocr_service, file_path, file_extension, detect_key_values, clean_text)
         
         # Create response structure similar to API
         response = {
@@ -103,7 +142,162 @@ async def process_file(
         raise e
 
 
+SUPPORTED_EXTENSIONS = ['.pdf', '.jpg', '.jpeg', '.png']
+
+
+def find_documents(paths: List[str]) -> List[Path]:
+    """Expand files and directories (recursively) into supported documents."""
+    documents = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            documents.extend(sorted(p for p in path.rglob("*") if p.suffix.lower() in SUPPORTED_EXTENSIONS))
+        elif path.suffix.lower() in SUPPORTED_EXTENSIONS:
+            documents.append(path)
+        else:
+            print(f"⚠️  Skipping unsupported file: {path}")
+    return documents
+
+
+async def reprocess_llm(ocr_service, store, doc_hash: str, fingerprint: str) -> bool:
+    """Re-run only the LLM stage on a stored document's OCR text."""
+    document = store.get(doc_hash)
+    # Rebuild the text the pipeline analyzed from the stored per-page OCR text
+    raw_text = "\n".join(document["pages"]).strip()
+    if not raw_text:
+        # Nothing to analyze; record the fingerprint so the document is no longer stale
+        store.update_analysis(doc_hash, None, None, fingerprint)
+        return True
+    analysis = await ocr_service.analyze_with_llm(ocr_service.clean_text(raw_text))
+    if "error" in analysis["structured_data"]:
+        print(f"❌ {document['filename']}: {analysis['structured_data']['error']}")
+        return False
+    store.update_analysis(doc_hash, analysis["document_classification"], analysis["structured_data"], fingerprint)
+    return True
+
+
+async def reprocess(paths: List[str], language: str = "auto", dry_run: bool = False) -> dict:
+    """
+    Bring the document store up to date, recomputing only stale stages.
+
+    Source files whose OCR fingerprint differs from the current engine
+    configuration (or that are not stored yet) are OCRed and analyzed again.
+    Every other stored document whose LLM fingerprint is stale only has its
+    stored OCR text re-analyzed; tesseract does not run. OCR staleness can
+    only be checked for documents whose source file is given.
+    """
+    OCRService = load_ocr_service()
+    from services.document_store import get_document_store
+    from services.ocr_service import llm_fingerprint
+    from utils.hash_utils import file_sha256
+
+    store = get_document_store()
+    current_llm = llm_fingerprint()
+    counts = {"ocr_and_llm": 0, "llm_only": 0, "up_to_date": 0, "failed": 0}
+    seen = set()
+
+    for path in find_documents(paths):
+        doc_hash = file_sha256(str(path))
+        seen.add(doc_hash)
+        kind = "pdf" if path.suffix.lower() == ".pdf" else "image"
+        ocr_service = OCRService(language=language)
+        document = store.get(doc_hash, include_pages=False)
+        ocr_service.engine.resolve_language(kind, str(path), file_hash=doc_hash)
+
+        if document is None or document["ocr_fingerprint"] != ocr_service.engine.fingerprint(kind):
+            print(f"🔄 {path}: OCR + LLM")
+            counts["ocr_and_llm"] += 1
+            if dry_run:
+                continue
+            try:
+                if kind == "pdf":
+                    await ocr_service.process_pdf(
+                        str(path), clean_text=True, filename=path.name, text_fields=[], file_hash=doc_hash
+                    )
+                else:
+                    await ocr_service.process_image(
+                        str(path), clean_text=True, filename=path.name, text_fields=[], file_hash=doc_hash
+                    )
+            except Exception as e:
+                print(f"❌ {path}: {e}")
+                counts["failed"] += 1
+        elif document["llm_fingerprint"] != current_llm:
+            print(f"🔄 {path}: LLM only")
+            counts["llm_only"] += 1
+            if not dry_run and not await reprocess_llm(ocr_service, store, doc_hash, current_llm):
+                counts["failed"] += 1
+        else:
+            counts["up_to_date"] += 1
+
+    # Stored documents without a source file given: only the LLM stage can be refreshed
+    ocr_service = OCRService(language=language)
+    for doc_hash in store.stale_llm_documents(current_llm):
+        if doc_hash in seen:
+            continue
+        print(f"🔄 {doc_hash[:12]}: LLM only")
+        counts["llm_only"] += 1
+        if not dry_run and not await reprocess_llm(ocr_service, store, doc_hash, current_llm):
+            counts["failed"] += 1
+
+    return counts
+
+
+def reprocess_main(argv: List[str]):
+    parser = argparse.ArgumentParser(
+        prog="cli_ocr.py reprocess",
+        description="Recompute only the stale OCR and LLM stages of documents in the document store",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python cli_ocr.py reprocess                  # re-analyze documents whose LLM fingerprint is stale
+  python cli_ocr.py reprocess archive/ --dry-run
+  python cli_ocr.py reprocess archive/ --store cache/documents.sqlite3
+        """
+    )
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        help="Source files or directories; needed to detect stale OCR and to add new documents"
+    )
+    parser.add_argument(
+        "-l", "--language",
+        default="auto",
+        help="OCR language code, or 'auto' to detect the script (default: auto)"
+    )
+    parser.add_argument(
+        "--store",
+        help="Document store to update (default: DOCUMENT_STORE_PATH or cache/documents.sqlite3)"
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only report which stages would be recomputed"
+    )
+    args = parser.parse_args(argv)
+
+    # Reprocessing always works on the document store, whatever the server config says
+    os.environ["DOCUMENT_STORE_ENABLED"] = "true"
+    if args.store:
+        os.environ["DOCUMENT_STORE_PATH"] = args.store
+
+    try:
+        counts = asyncio.run(reprocess(args.paths, language=args.language, dry_run=args.dry_run))
+    except Exception as e:
+        print(f"❌ Reprocessing failed: {e}")
+        sys.exit(1)
+
+    verb = "would be" if args.dry_run else "were"
+    print(f"\n✅ {counts['ocr_and_llm']} document(s) {verb} fully reprocessed, "
+          f"{counts['llm_only']} re-analyzed with the LLM only, {counts['up_to_date']} up to date")
+    if counts["failed"]:
+        print(f"❌ {counts['failed']} document(s) failed")
+        sys.exit(1)
+
+
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "reprocess":
+        reprocess_main(sys.argv[2:])
+        return
+
     parser = argparse.ArgumentParser(
         description="OCR-to-JSON CLI Tool - Extract text from images and PDFs",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -113,8 +307,11 @@ Examples:
   python cli_ocr.py image.jpg --language fra --output result.json
   python cli_ocr.py scan.png --no-key-detection --format text
   python cli_ocr.py invoice.pdf --output invoice_data.json --language deu
+  python cli_ocr.py scan.pdf --dpi 300 --raster-threads 8
+  python cli_ocr.py slow_scan.pdf --profile
+  python cli_ocr.py reprocess archive/        # recompute stale stages in the document store
 
-Supported Languages:
+Supported Languages (or 'auto' to detect from the document's script):
   eng (English), fra (French), deu (German), spa (Spanish), 
   ita (Italian), por (Portuguese), rus (Russian), chi_sim (Chinese Simplified),
   chi_tra (Chinese Traditional), jpn (Japanese), kor (Korean), 
@@ -136,8 +333,8 @@ Supported Languages:
     
     parser.add_argument(
         "-l", "--language",
-        default="eng",
-        help="OCR language code (default: eng)"
+        default="auto",
+        help="OCR language code, or 'auto' to detect the script (default: auto)"
     )
     
     parser.add_argument(
@@ -152,6 +349,29 @@ Supported Languages:
         help="Disable text cleaning and normalization"
     )
     
+    parser.add_argument(
+        "--dpi",
+        help="PDF rasterization DPI, or 'auto' to choose per page from size and text density (default: auto)"
+    )
+    
+    parser.add_argument(
+        "--raster-threads",
+        type=int,
+        help="Threads used to rasterize PDF pages (default: up to 4)"
+    )
+    
+    parser.add_argument(
+        "--grayscale",
+        choices=["true", "false", "auto"],
+        help="Rasterize PDF pages in grayscale, in color, or in color only where a page has color (default: PDF_GRAYSCALE, auto)"
+    )
+    
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile the run and save a flamegraph (.folded) and stage summary to PROFILE_DIR (default: profiles/)"
+    )
+    
     parser.add_argument(
         "-f", "--format",
         choices=["json", "text"],
@@ -175,7 +395,11 @@ Supported Languages:
             language=args.language,
             detect_key_values=not args.no_key_detection,
             clean_text=not args.no_text_cleaning,
-            format_output=args.format
+            format_output=args.format,
+            dpi=args.dpi,
+            raster_threads=args.raster_threads,
+            grayscale=args.grayscale,
+            profile=args.profile
         ))
         
         print(f"\n✅ Processing completed successfully!")
@@ -0,0 +1,157 @@
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.lower() in ("1", "true", "yes", "on")
+
+
+def _worker_share(name: str, default: float, workers: int) -> float:
+    """Split a host-wide budget evenly across the web workers"""
+    total = float(os.getenv(name, default))
+    if total < workers:
+        # Each worker needs at least one slot or token, so the host runs over budget
+        print(
+            f"Warning: {name}={total:g} is below WEB_CONCURRENCY={workers}; "
+            f"the host-wide limit is effectively {workers}"
+        )
+    return max(1.0, total / workers)
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Backend configuration, read once from the environment and .env"""
+
+    google_api_key: Optional[str]
+    gemini_model: str
+    # Overrides the Gemini API host, e.g. to point at scripts/mock_gemini.py
+    gemini_api_endpoint: Optional[str]
+
+    # Server processes on this host (WEB_CONCURRENCY); host-wide budgets are split across them
+    web_workers: int
+
+    # Admission control (services/admission.py)
+    ocr_concurrency: int
+    ocr_max_queue: int
+    ocr_max_wait: float
+    ocr_page_workers: int
+
+    # PDF rasterization (services/ocr_engine.py)
+    pdf_dpi: str
+    pdf_raster_threads: int
+    # "true", "false" or "auto" (per page, from the probe render)
+    pdf_grayscale: str
+    # Language packs tried for Latin-script documents with language="auto", if installed
+    ocr_latin_languages: str
+    llm_concurrency: int
+    llm_max_queue: int
+    llm_max_wait: float
+    llm_rate_per_minute: float
+    llm_burst: float
+
+    # Resilient Gemini client (services/llm_client.py)
+    llm_timeout: float
+    llm_max_retries: int
+    llm_backoff_base: float
+    llm_backoff_max: float
+    llm_breaker_failure_rate: float
+    llm_breaker_min_calls: int
+    llm_breaker_window: float
+    llm_breaker_cooldown: float
+
+    # Shared result cache (services/result_cache.py)
+    result_cache_enabled: bool
+    result_cache_path: str
+    result_cache_ttl: float
+    result_cache_max_entries: int
+
+    # Persistent document store and search index (services/document_store.py)
+    document_store_enabled: bool
+    document_store_path: str
+
+    # Event-loop lag and blocking-call detection (services/loop_monitor.py)
+    loop_monitor_mode: str
+    loop_monitor_interval: float
+    loop_block_threshold: float
+
+    # Request profiling (services/profiling.py)
+    profiling_enabled: bool
+    profile_slow_seconds: float
+    profile_dir: str
+    profile_sample_interval: float
+
+    # Response serialization (utils/response_utils.py)
+    response_compression: bool
+    response_compression_min_bytes: int
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        cpu_count = os.cpu_count() or 1
+        web_workers = max(1, int(os.getenv("WEB_CONCURRENCY", 1)))
+        # Cores available to this process; OCR jobs and their page workers share them
+        worker_cores = max(1, cpu_count // web_workers)
+        ocr_concurrency = int(os.getenv("OCR_CONCURRENCY", worker_cores))
+        # LLM limits are host-wide (they protect the API key), so each process gets its share;
+        # slots round down so the workers together never exceed LLM_CONCURRENCY
+        llm_concurrency = int(_worker_share("LLM_CONCURRENCY", 8, web_workers))
+        return cls(
+            google_api_key=os.getenv("GOOGLE_API_KEY"),
+            gemini_model=os.getenv("GEMINI_MODEL", "gemini-2.0-flash"),
+            gemini_api_endpoint=os.getenv("GEMINI_API_ENDPOINT") or None,
+            web_workers=web_workers,
+            ocr_concurrency=ocr_concurrency,
+            ocr_max_queue=int(os.getenv("OCR_MAX_QUEUE", ocr_concurrency * 4)),
+            ocr_max_wait=float(os.getenv("OCR_MAX_WAIT", 60)),
+            # Pages of one PDF OCRed in parallel; by default this uses the cores
+            # left over when fewer documents than cores are processed at once
+            ocr_page_workers=int(os.getenv("OCR_PAGE_WORKERS", max(1, worker_cores // ocr_concurrency))),
+            pdf_dpi=os.getenv("PDF_DPI", "auto"),
+            pdf_raster_threads=int(os.getenv("PDF_RASTER_THREADS", min(4, worker_cores))),
+            pdf_grayscale=os.getenv("PDF_GRAYSCALE", "auto"),
+            ocr_latin_languages=os.getenv("OCR_LATIN_LANGUAGES", "eng"),
+            llm_concurrency=llm_concurrency,
+            llm_max_queue=int(os.getenv("LLM_MAX_QUEUE", llm_concurrency * 4)),
+            llm_max_wait=float(os.getenv("LLM_MAX_WAIT", 30)),
+            llm_rate_per_minute=float(os.getenv("LLM_RATE_PER_MINUTE", 60)) / web_workers,
+            llm_burst=_worker_share("LLM_BURST", 10, web_workers),
+            llm_timeout=float(os.getenv("LLM_TIMEOUT", 30)),
+            llm_max_retries=int(os.getenv("LLM_MAX_RETRIES", 3)),
+            llm_backoff_base=float(os.getenv("LLM_BACKOFF_BASE", 0.5)),
+            llm_backoff_max=float(os.getenv("LLM_BACKOFF_MAX", 8)),
+            llm_breaker_failure_rate=float(os.getenv("LLM_BREAKER_FAILURE_RATE", 0.5)),
+            llm_breaker_min_calls=int(os.getenv("LLM_BREAKER_MIN_CALLS", 10)),
+            llm_breaker_window=float(os.getenv("LLM_BREAKER_WINDOW", 60)),
+            llm_breaker_cooldown=float(os.getenv("LLM_BREAKER_COOLDOWN", 30)),
+            result_cache_enabled=_env_bool("RESULT_CACHE_ENABLED", True),
+            result_cache_path=os.getenv("RESULT_CACHE_PATH", "cache/results.sqlite3"),
+            result_cache_ttl=float(os.getenv("RESULT_CACHE_TTL", 0)),
+            result_cache_max_entries=int(os.getenv("RESULT_CACHE_MAX_ENTRIES", 10000)),
+            document_store_enabled=_env_bool("DOCUMENT_STORE_ENABLED", False),
+            document_store_path=os.getenv("DOCUMENT_STORE_PATH", "cache/documents.sqlite3"),
+            # "off", "on", or "debug" (also enables asyncio's slow-callback logging)
+            loop_monitor_mode=os.getenv("LOOP_MONITOR", "on").lower(),
+            loop_monitor_interval=float(os.getenv("LOOP_MONITOR_INTERVAL", 0.1)),
+            loop_block_threshold=float(os.getenv("LOOP_BLOCK_THRESHOLD", 0.25)),
+            # Lets clients request a profile with X-Profile: 1 or ?profile=1
+            profiling_enabled=_env_bool("PROFILING_ENABLED", False),
+            # Profile every request and keep those slower than this; 0 disables
+            profile_slow_seconds=float(os.getenv("PROFILE_SLOW_SECONDS", 0)),
+            profile_dir=os.getenv("PROFILE_DIR", "profiles"),
+            profile_sample_interval=float(os.getenv("PROFILE_SAMPLE_INTERVAL", 0.005)),
+            response_compression=_env_bool("RESPONSE_COMPRESSION", True),
+            response_compression_min_bytes=int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", 1024)),
+        )
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Load .env once and return the process-wide settings"""
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    return Settings.from_env()
@@ -0,0 +1,38 @@
+"""
+Gunicorn configuration for the multi-worker deployment mode.
+
+Run with: gunicorn -c gunicorn.conf.py app:app
+
+Each worker is a uvicorn worker process that warms up its own OCR engine and
+LLM client at startup (see services/warmup.py) and reports readiness on /ready.
+Workers share OCR and LLM results through the SQLite cache in
+services/result_cache.py, so a document handled by one worker is not
+reprocessed by another.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+
+# OCR is CPU-bound, so size the worker pool to the cores available
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Admission limits are enforced per process. Workers learn the worker count
+# from WEB_CONCURRENCY and split host-wide budgets (cores for OCR_CONCURRENCY
+# and OCR_PAGE_WORKERS, the LLM rate, burst and concurrency) in
+# config.Settings after loading .env, so .env values are honoured and a
+# reload does not divide them again.
+raw_env = [f"WEB_CONCURRENCY={workers}"]
+
+# The app is not preloaded: gRPC clients used by google-generativeai are not
+# fork-safe, so each worker builds its own client after the fork.
+preload_app = False
+
+# Large scanned PDFs can take a while to OCR
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 180))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
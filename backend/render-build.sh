@@ -2,7 +2,7 @@
 
 # Install system dependencies
 apt-get update
-apt-get install -y tesseract-ocr tesseract-ocr-eng poppler-utils
+apt-get install -y tesseract-ocr tesseract-ocr-eng tesseract-ocr-osd poppler-utils
 
 # Install Python dependencies
 pip install -r requirements.txt
@@ -1,23 +1,33 @@
 from fastapi import APIRouter, Body, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from services.chatbot_rag import generate_summary
+from services.admission import admission_controller, AdmissionRejected
+from services.llm_client import LLMUnavailable
 from pydantic import BaseModel
 import json
 
 router = APIRouter()
 
+def load_templates() -> dict:
+    with open("templates/templates.json", "r") as f:
+        return json.load(f)
+
 @router.post("/summarize")
-def summarize(content: str = Body(...), template_id: int = Body(...)):
+async def summarize(content: str = Body(...), template_id: int = Body(...)):
     """Generate summary using templates"""
     try:
-        with open("templates/templates.json", "r") as f:
-            templates = json.load(f)
+        templates = await run_in_threadpool(load_templates)
         
         template = templates.get(str(template_id), "")
         if not template:
             raise HTTPException(status_code=400, detail="Invalid template ID")
         
-        summary = generate_summary(content, template)
+        summary = await admission_controller.run_llm(generate_summary, content, template)
         return {"summary": summary}
+    except (HTTPException, AdmissionRejected):
+        raise
+    except LLMUnavailable as e:
+        raise AdmissionRejected("llm", 503, e.retry_after, str(e))
     except FileNotFoundError:
         raise HTTPException(status_code=500, detail="Templates file not found")
     except Exception as e:
@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Header, HTTPException, Query
+from services.document_store import get_document_store
+from utils.response_utils import build_json_response
+
+router = APIRouter()
+
+def _require_store():
+    store = get_document_store()
+    if store is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Document store is disabled. Set DOCUMENT_STORE_ENABLED=true to enable it."
+        )
+    return store
+
+@router.get("/search")
+def search_documents(
+    q: str = Query(..., min_length=1, description="Words to search for in document text"),
+    limit: int = Query(20, ge=1, le=100)
+):
+    """
+    Full-text search over previously processed documents.
+    
+    - **q**: Words that must all appear on a matching page
+    - **limit**: Maximum number of matching pages to return
+    """
+    store = _require_store()
+    results = store.search(q, limit=limit)
+    return {"query": q, "count": len(results), "results": results}
+
+@router.get("/stats")
+def document_store_stats():
+    """Number of documents and pages in the store"""
+    return _require_store().stats()
+
+@router.get("/{document_hash}")
+def get_document(
+    document_hash: str,
+    include_pages: bool = Query(True),
+    accept_encoding: str = Header("")
+):
+    """Retrieve a processed document's text and structured data by its SHA-256 hash"""
+    document = _require_store().get(document_hash, include_pages=include_pages)
+    if document is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return build_json_response(document, accept_encoding)
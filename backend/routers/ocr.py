@@ -1,23 +1,43 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Form
-from services.ocr_service import OCRService
-from typing import Optional
-import tempfile
+from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Request
+from fastapi.concurrency import run_in_threadpool
+from services.ocr_service import OCRService, TEXT_FIELDS, llm_fingerprint
+from services.admission import admission_controller, AdmissionRejected
+from utils.file_utils import save_upload_to_temp
+from utils.response_utils import json_response
+from services.document_store import get_document_store
+from services.ocr_engine import installed_languages
+from typing import List, Optional
 import os
 
 router = APIRouter()
 
+def parse_text_fields(text_fields: str) -> List[str]:
+    fields = [field.strip() for field in text_fields.split(",") if field.strip()]
+    invalid = [field for field in fields if field not in TEXT_FIELDS]
+    if invalid:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid text field(s): {', '.join(invalid)}. Allowed: {', '.join(TEXT_FIELDS)}"
+        )
+    return fields
+
 @router.post("/extract")
 async def extract_text_to_json(
+    request: Request,
     file: UploadFile = File(...),
     clean_text: bool = Form(True),
-    language: str = Form("eng")
+    language: str = Form("auto"),
+    text_fields: str = Form("raw_text,processed_text")
 ):
     """
     Extract text from uploaded image or PDF and return AI-analyzed structured JSON output.
     
     - **file**: Image (JPG, PNG) or PDF file
     - **clean_text**: Whether to apply text cleaning (remove extra spaces, line breaks)
-    - **language**: OCR language pack (eng, fra, deu, spa, etc.)
+    - **language**: OCR language pack (eng, fra, deu, spa, etc.), or "auto" to detect the script
+    - **text_fields**: Comma-separated text to return: raw_text, processed_text and/or pages (raw text per page); empty for none
+    
+    Large responses are gzip or zstd compressed when the client accepts it.
     """
     
     # Validate file type
@@ -30,11 +50,13 @@ async def extract_text_to_json(
             detail=f"Unsupported file type. Allowed: {', '.join(allowed_extensions)}"
         )
     
+    fields = parse_text_fields(text_fields)
+    
+    # Fail fast before reading the upload if the OCR stage is saturated
+    admission_controller.check_capacity("ocr")
+    
     # Save uploaded file temporarily
-    with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as tmp_file:
-        content = await file.read()
-        tmp_file.write(content)
-        tmp_file_path = tmp_file.name
+    tmp_file_path = await save_upload_to_temp(file, file_extension)
     
     try:
         print(f"Starting OCR processing for: {file.filename}")
@@ -44,24 +66,27 @@ async def extract_text_to_json(
         
         # Process file based on type
         if file_extension == '.pdf':
-            result = await ocr_service.process_pdf(tmp_file_path, detect_key_values=False, clean_text=clean_text, use_llm=False)
+            result = await ocr_service.process_pdf(tmp_file_path, detect_key_values=False, clean_text=clean_text, use_llm=False, filename=file.filename, text_fields=fields)
         else:
-            result = await ocr_service.process_image(tmp_file_path, detect_key_values=False, clean_text=clean_text, use_llm=False)
+            result = await ocr_service.process_image(tmp_file_path, detect_key_values=False, clean_text=clean_text, use_llm=False, filename=file.filename, text_fields=fields)
         
         print(f"Completed OCR processing for: {file.filename}")
         
-        return {
+        return await json_response(request, {
             "filename": file.filename,
             "file_type": file_extension[1:].upper(),
             "processing_options": {
                 "language": language,
                 "text_cleaning": clean_text,
+                "text_fields": fields,
                 "ai_analysis": True
             },
             "extracted_data": result,
             "status": "success"
-        }
+        })
         
+    except AdmissionRejected:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     finally:
@@ -73,14 +98,14 @@ async def extract_text_to_json(
 async def analyze_document_with_llm(
     file: UploadFile = File(...),
     analysis_type: str = Form("general"),
-    language: str = Form("eng")
+    language: str = Form("auto")
 ):
     """
     Analyze document using LLM for intelligent structure extraction.
     
     - **file**: Image (JPG, PNG) or PDF file
     - **analysis_type**: Type of analysis (general, invoice, identity, financial)
-    - **language**: OCR language pack (eng, fra, deu, spa, etc.)
+    - **language**: OCR language pack (eng, fra, deu, spa, etc.), or "auto" to detect the script
     """
     
     # Validate file type
@@ -101,11 +126,11 @@ async def analyze_document_with_llm(
             detail=f"Invalid analysis type. Allowed: {', '.join(valid_analysis_types)}"
         )
     
+    # Fail fast before reading the upload if the OCR stage is saturated
+    admission_controller.check_capacity("ocr")
+    
     # Save uploaded file temporarily
-    with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as tmp_file:
-        content = await file.read()
-        tmp_file.write(content)
-        tmp_file_path = tmp_file.name
+    tmp_file_path = await save_upload_to_temp(file, file_extension)
     
     try:
         print(f"Starting LLM analysis for: {file.filename}")
@@ -115,14 +140,20 @@ async def analyze_document_with_llm(
         
         # Extract text first
         if file_extension == '.pdf':
-            raw_text = await ocr_service.process_pdf(tmp_file_path, detect_key_values=False, clean_text=True, use_llm=False)
+            raw_text = await ocr_service.process_pdf(tmp_file_path, detect_key_values=False, clean_text=True, use_llm=False, filename=file.filename, text_fields=["processed_text"], analyze=False)
         else:
-            raw_text = await ocr_service.process_image(tmp_file_path, detect_key_values=False, clean_text=True, use_llm=False)
+            raw_text = await ocr_service.process_image(tmp_file_path, detect_key_values=False, clean_text=True, use_llm=False, filename=file.filename, text_fields=["processed_text"], analyze=False)
         
         text_content = raw_text["processed_text"]
         
         # Perform LLM analysis
-        structured_data = ocr_service.llm_enhanced_parsing(text_content, analysis_type)
+        structured_data = await admission_controller.run_llm(ocr_service.llm_enhanced_parsing, text_content, analysis_type)
+        
+        store = get_document_store()
+        if store is not None and raw_text.get("document_hash") and "error" not in structured_data:
+            await run_in_threadpool(
+                store.update_analysis, raw_text["document_hash"], analysis_type, structured_data, llm_fingerprint()
+            )
         
         print(f"Completed LLM analysis for: {file.filename}")
         
@@ -133,9 +164,12 @@ async def analyze_document_with_llm(
             "text_length": len(text_content),
             "structured_data": structured_data,
             "processing_timestamp": raw_text["processing_timestamp"],
+            "document_hash": raw_text.get("document_hash"),
             "status": "success"
         }
         
+    except AdmissionRejected:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     finally:
@@ -145,7 +179,8 @@ async def analyze_document_with_llm(
 
 @router.get("/languages")
 async def get_supported_languages():
-    """Get list of supported OCR languages"""
+    """Get list of supported OCR languages and the packs installed on this server"""
+    installed = await run_in_threadpool(installed_languages)
     return {
         "supported_languages": {
             "eng": "English",
@@ -162,5 +197,10 @@ async def get_supported_languages():
             "ara": "Arabic",
             "hin": "Hindi"
         },
+        "installed_languages": [lang for lang in installed if lang != "osd"],
+        "auto_detection": {
+            "available": "osd" in installed,
+            "usage": 'Pass language="auto" to detect the script and OCR with only the matching installed packs'
+        },
         "note": "Additional language packs may need to be installed"
     }
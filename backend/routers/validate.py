@@ -1,21 +1,23 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, HTTPException, Request
 from services.image_validation import extract_text_from_pdf_async
-import tempfile
+from services.admission import admission_controller, AdmissionRejected
+from utils.file_utils import save_upload_to_temp
+from utils.response_utils import json_response
 import os
 import asyncio
 
 router = APIRouter()
 
 @router.post("/pdf")
-async def process_pdf(file: UploadFile = File(...)):
+async def process_pdf(request: Request, file: UploadFile = File(...)):
     if not file.filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files are allowed")
     
+    # Fail fast before reading the upload if the OCR stage is saturated
+    admission_controller.check_capacity("ocr")
+    
     # Save uploaded file temporarily
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-        content = await file.read()
-        tmp_file.write(content)
-        tmp_file_path = tmp_file.name
+    tmp_file_path = await save_upload_to_temp(file, '.pdf')
     
     try:
         print(f"Starting PDF processing for: {file.filename}")
@@ -23,11 +25,13 @@ async def process_pdf(file: UploadFile = File(...)):
         extracted_text = await extract_text_from_pdf_async(tmp_file_path)
         print(f"Completed PDF processing for: {file.filename}")
         
-        return {
+        return await json_response(request, {
             "filename": file.filename,
             "extracted_text": extracted_text,
             "status": "success"
-        }
+        })
+    except AdmissionRejected:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     finally:
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Import-time benchmark for the backend.
+
+Runs `python -X importtime` for each entry point, reports the slowest
+modules, and fails if an entry point exceeds its time budget or eagerly
+imports one of the heavy OCR/LLM dependencies.
+
+Usage: cd backend && python scripts/check_import_time.py [--runs 5] [--top 15]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Budgets in milliseconds for the median cumulative import time
+IMPORT_BUDGETS_MS = {
+    "app": 1500,
+    "cli_ocr": 150,
+}
+
+# These are loaded on first use; importing them eagerly is a regression
+LAZY_MODULES = [
+    "pytesseract",
+    "pdf2image",
+    "PIL",
+    "google.generativeai",
+]
+
+
+def measure(module: str) -> Tuple[float, List[Tuple[str, int]]]:
+    """Import module in a fresh interpreter. Returns (total ms, [(name, cumulative us)])."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    timings = []
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # Format: "import time: <self us> | <cumulative us> | <indented module name>"
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        timings.append((name, int(cumulative_us)))
+        if name == module:
+            total_us = int(cumulative_us)
+    return total_us / 1000.0, timings
+
+
+def check(module: str, budget_ms: float, runs: int, top: int) -> bool:
+    totals = []
+    timings: List[Tuple[str, int]] = []
+    for _ in range(runs):
+        total_ms, timings = measure(module)
+        totals.append(total_ms)
+    median_ms = statistics.median(totals)
+
+    print(f"\n== import {module}: median {median_ms:.1f} ms over {runs} runs (budget {budget_ms:.0f} ms)")
+    slowest: Dict[str, int] = {}
+    for name, cumulative_us in timings:
+        slowest[name] = max(slowest.get(name, 0), cumulative_us)
+    for name, cumulative_us in sorted(slowest.items(), key=lambda item: -item[1])[:top]:
+        print(f"   {cumulative_us / 1000.0:9.1f} ms  {name}")
+
+    ok = True
+    eager = [m for m in LAZY_MODULES if any(name == m or name.startswith(m + ".") for name, _ in timings)]
+    if eager:
+        print(f"FAIL: {module} eagerly imports {', '.join(eager)}")
+        ok = False
+    if median_ms > budget_ms:
+        print(f"FAIL: {module} import time {median_ms:.1f} ms exceeds budget {budget_ms:.0f} ms")
+        ok = False
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check backend import time against budgets")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreter runs per module (default: 5)")
+    parser.add_argument("--top", type=int, default=15, help="Slowest modules to list (default: 15)")
+    parser.add_argument("modules", nargs="*", help="Modules to check (default: all budgeted entry points)")
+    args = parser.parse_args()
+
+    modules = args.modules or list(IMPORT_BUDGETS_MS)
+    results = [check(m, IMPORT_BUDGETS_MS.get(m, float("inf")), args.runs, args.top) for m in modules]
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+Offline load test for the DocuMend API.
+
+Starts a local mock Gemini server (scripts/mock_gemini.py) and the FastAPI app
+pointed at it, then drives /ocr/extract, /ocr/analyze, /validate/pdf and
+/summarize/summarize with synthetic documents at a fixed concurrency. Reports
+throughput, latency percentiles and error rates per endpoint, plus event-loop
+lag measured by probing /ready while under load and, when the server runs its
+loop monitor, the lag and blocked-loop count it reports in /metrics. The
+server's LLM client counters (retries, circuit breaker transitions) are
+included, so --llm-error-rate exercises the retry and fail-fast paths.
+
+Usage:
+  cd backend && python scripts/loadtest.py --concurrency 8 --duration 60
+  python scripts/loadtest.py --mix extract=3,analyze=1,validate=1,summarize=2 --llm-error-rate 0.05
+  python scripts/loadtest.py --base-url http://127.0.0.1:8000   # an already running server
+
+Release gate: pass --max-error-rate, --max-p99-ms and/or --max-loop-lag-ms; the
+exit code is 1 if any threshold is exceeded.
+"""
+
+import argparse
+import io
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_gemini import MockGeminiConfig, start_mock_gemini  # noqa: E402
+
+DEFAULT_MIX = "extract=4,analyze=2,validate=2,summarize=2"
+# Endpoint name -> (path, document kind it needs)
+ENDPOINTS = {
+    "extract": ("/ocr/extract", "any"),
+    "analyze": ("/ocr/analyze", "any"),
+    "validate": ("/validate/pdf", "pdf"),
+    "summarize": ("/summarize/summarize", "text"),
+}
+ANALYSIS_TYPES = ["general", "invoice", "identity", "financial"]
+
+
+def parse_mix(mix: str) -> Dict[str, int]:
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{name}'. Choose from: {', '.join(ENDPOINTS)}")
+        weights[name] = int(weight or 1)
+    return weights
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    # Nearest-rank percentile
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(p / 100.0 * len(ordered)) - 1))
+    return ordered[index]
+
+
+# --- Synthetic documents ----------------------------------------------------
+
+def _document_lines(doc_id: int, rng: random.Random) -> List[str]:
+    total = rng.randint(10, 9999)
+    return [
+        f"INVOICE #{doc_id:06d}",
+        f"Date: {rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2024",
+        "Vendor: Example Supplies Ltd, 12 Market Street",
+        "Customer: Jane Doe, jane.doe@example.com",
+        f"Item A   {rng.randint(1, 9)} x ${rng.randint(5, 99)}.00",
+        f"Item B   {rng.randint(1, 9)} x ${rng.randint(5, 99)}.00",
+        f"Subtotal: ${total}.00",
+        f"Tax: ${total // 10}.00",
+        f"Total: ${total + total // 10}.00",
+        "Thank you for your business.",
+    ]
+
+
+def _render_page(lines: List[str]):
+    from PIL import Image, ImageDraw, ImageFont
+
+    try:
+        font = ImageFont.load_default(size=28)
+    except TypeError:
+        # Pillow < 10.1 only has the small bitmap font
+        font = ImageFont.load_default()
+    page = Image.new("L", (1240, 1754), color=255)
+    draw = ImageDraw.Draw(page)
+    for i, line in enumerate(lines):
+        draw.text((100, 120 + i * 60), line, fill=0, font=font)
+    return page
+
+
+def build_documents(count: int, pdf_pages: int, seed: int) -> Dict[str, List[dict]]:
+    """Generate a pool of PNG and PDF documents plus plain-text summaries"""
+    rng = random.Random(seed)
+    documents = {"image": [], "pdf": [], "text": []}
+    for doc_id in range(count):
+        lines = _document_lines(doc_id, rng)
+
+        page = _render_page(lines)
+        buffer = io.BytesIO()
+        page.save(buffer, format="PNG")
+        documents["image"].append({"name": f"doc_{doc_id}.png", "mime": "image/png", "data": buffer.getvalue()})
+
+        pages = [page] + [_render_page(_document_lines(doc_id * 1000 + n, rng)) for n in range(1, pdf_pages)]
+        buffer = io.BytesIO()
+        pages[0].save(buffer, format="PDF", save_all=True, append_images=pages[1:])
+        documents["pdf"].append({"name": f"doc_{doc_id}.pdf", "mime": "application/pdf", "data": buffer.getvalue()})
+
+        documents["text"].append({"content": "\n".join(lines * 5)})
+    return documents
+
+
+# --- Server management ------------------------------------------------------
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_app(mock_url: str, scratch_dir: str, extra_env: Dict[str, str]) -> Tuple[subprocess.Popen, str]:
+    port = _free_port()
+    env = dict(os.environ)
+    env.update({
+        "GOOGLE_API_KEY": "loadtest",
+        "GEMINI_API_ENDPOINT": mock_url,
+        "RESULT_CACHE_PATH": os.path.join(scratch_dir, "results.sqlite3"),
+        "DOCUMENT_STORE_PATH": os.path.join(scratch_dir, "documents.sqlite3"),
+    })
+    env.update(extra_env)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+    return process, f"http://127.0.0.1:{port}"
+
+
+def wait_until_ready(base_url: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{base_url}/ready", timeout=2).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"Server at {base_url} did not become ready within {timeout:.0f}s")
+
+
+# --- Load generation --------------------------------------------------------
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples: Dict[str, List[dict]] = {name: [] for name in ENDPOINTS}
+
+    def record(self, endpoint: str, status: Optional[int], latency: float, error: Optional[str] = None):
+        with self.lock:
+            self.samples[endpoint].append({"status": status, "latency": latency, "error": error})
+
+
+def send_request(session: requests.Session, base_url: str, endpoint: str, documents: Dict[str, List[dict]],
+                 rng: random.Random, language: str, timeout: float) -> requests.Response:
+    path, kind = ENDPOINTS[endpoint]
+    url = f"{base_url}{path}"
+    if kind == "text":
+        document = rng.choice(documents["text"])
+        return session.post(url, json={"content": document["content"], "template_id": rng.randint(1, 5)}, timeout=timeout)
+
+    if kind == "any":
+        kind = rng.choice(["image", "pdf"])
+    document = rng.choice(documents[kind])
+    files = {"file": (document["name"], document["data"], document["mime"])}
+    data = {}
+    if endpoint in ("extract", "analyze"):
+        data["language"] = language
+    if endpoint == "analyze":
+        data["analysis_type"] = rng.choice(ANALYSIS_TYPES)
+    return session.post(url, files=files, data=data, timeout=timeout)
+
+
+def run_worker(worker_id: int, base_url: str, weights: Dict[str, int], documents, recorder: Recorder,
+               deadline: float, remaining: List[int], remaining_lock: threading.Lock, language: str,
+               timeout: float, seed: int):
+    rng = random.Random(seed + worker_id)
+    names = list(weights)
+    session = requests.Session()
+    while time.monotonic() < deadline:
+        with remaining_lock:
+            if remaining[0] == 0:
+                return
+            remaining[0] -= 1
+        endpoint = rng.choices(names, weights=[weights[n] for n in names])[0]
+        started = time.perf_counter()
+        try:
+            response = send_request(session, base_url, endpoint, documents, rng, language, timeout)
+            recorder.record(endpoint, response.status_code, time.perf_counter() - started,
+                            None if response.ok else response.text[:200])
+        except requests.RequestException as e:
+            recorder.record(endpoint, None, time.perf_counter() - started, str(e)[:200])
+
+
+def probe_loop_lag(base_url: str, stop: threading.Event, samples: List[float], interval: float):
+    """
+    Measure round trips of the trivial async /ready endpoint while under load.
+
+    The handler does no work, so its latency beyond an idle baseline is time
+    spent waiting for the server's event loop.
+    """
+    session = requests.Session()
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            session.get(f"{base_url}/ready", timeout=10)
+            samples.append(time.perf_counter() - started)
+        except requests.RequestException:
+            pass
+        stop.wait(interval)
+
+
+def fetch_server_metrics(base_url: str) -> dict:
+    """The server's /metrics, or an empty dict if unavailable"""
+    try:
+        response = requests.get(f"{base_url}/metrics", timeout=10)
+        if response.ok:
+            return response.json()
+    except (requests.RequestException, ValueError):
+        pass
+    return {}
+
+
+def summarize(recorder: Recorder, elapsed: float, lag_samples: List[float], lag_baseline: float,
+              server_metrics: Optional[dict] = None) -> dict:
+    report = {"duration_seconds": round(elapsed, 2), "endpoints": {}}
+    all_latencies, total, failed, rejected = [], 0, 0, 0
+    for endpoint, samples in recorder.samples.items():
+        if not samples:
+            continue
+        latencies = [s["latency"] * 1000 for s in samples]
+        statuses: Dict[str, int] = {}
+        for s in samples:
+            key = str(s["status"]) if s["status"] is not None else "connection_error"
+            statuses[key] = statuses.get(key, 0) + 1
+        errors = sum(1 for s in samples if s["status"] is None or s["status"] >= 400)
+        endpoint_rejected = sum(1 for s in samples if s["status"] in (429, 503))
+        report["endpoints"][endpoint] = {
+            "requests": len(samples),
+            "throughput_rps": round(len(samples) / elapsed, 2),
+            "error_rate": round(errors / len(samples), 4),
+            "rejected": endpoint_rejected,
+            "statuses": statuses,
+            "latency_ms": {
+                "p50": round(percentile(latencies, 50), 1),
+                "p90": round(percentile(latencies, 90), 1),
+                "p99": round(percentile(latencies, 99), 1),
+                "max": round(max(latencies), 1),
+            },
+        }
+        all_latencies.extend(latencies)
+        total += len(samples)
+        failed += errors
+        rejected += endpoint_rejected
+
+    lag_ms = [max(0.0, (s - lag_baseline) * 1000) for s in lag_samples]
+    report["overall"] = {
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "error_rate": round(failed / total, 4) if total else 0.0,
+        "rejected": rejected,
+        "latency_ms": {
+            "p50": round(percentile(all_latencies, 50), 1),
+            "p90": round(percentile(all_latencies, 90), 1),
+            "p99": round(percentile(all_latencies, 99), 1),
+            "max": round(max(all_latencies), 1) if all_latencies else 0.0,
+        },
+    }
+    report["event_loop_lag_ms"] = {
+        "probes": len(lag_ms),
+        "baseline_rtt_ms": round(lag_baseline * 1000, 2),
+        "p50": round(percentile(lag_ms, 50), 1),
+        "p99": round(percentile(lag_ms, 99), 1),
+        "max": round(max(lag_ms), 1) if lag_ms else 0.0,
+    }
+    server_metrics = server_metrics or {}
+    if server_metrics.get("event_loop") is not None:
+        report["server_event_loop"] = server_metrics["event_loop"]
+    if server_metrics.get("llm_client") is not None:
+        report["server_llm_client"] = server_metrics["llm_client"]
+    return report
+
+
+def print_report(report: dict):
+    print(f"\nDuration: {report['duration_seconds']}s")
+    print(f"{'endpoint':<11}{'reqs':>7}{'rps':>8}{'err%':>7}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    rows = list(report["endpoints"].items()) + [("overall", report["overall"])]
+    for name, stats in rows:
+        latency = stats["latency_ms"]
+        print(f"{name:<11}{stats['requests']:>7}{stats['throughput_rps']:>8}{stats['error_rate'] * 100:>7.1f}"
+              f"{latency['p50']:>10}{latency['p90']:>10}{latency['p99']:>10}{latency['max']:>10}")
+    lag = report["event_loop_lag_ms"]
+    print(f"\nEvent-loop lag ({lag['probes']} probes, baseline RTT {lag['baseline_rtt_ms']} ms): "
+          f"p50 {lag['p50']} ms, p99 {lag['p99']} ms, max {lag['max']} ms")
+    server_loop = report.get("server_event_loop")
+    if server_loop:
+        server_lag = server_loop["lag_ms"]
+        print(f"Server loop monitor: p50 {server_lag['p50']} ms, p99 {server_lag['p99']} ms, "
+              f"max {server_lag['max']} ms, blocked {server_loop['blocked_count']} times")
+        for block in server_loop["recent_blocks"]:
+            blocked_for = block["blocked_for_seconds"] or block["detected_after_seconds"]
+            location = block["stack"][-1].strip() if block["stack"] else "?"
+            print(f"  blocked {blocked_for * 1000:.0f} ms at: {location}")
+    llm_client = report.get("server_llm_client")
+    if llm_client:
+        print(f"Server LLM client: {llm_client['calls']} calls, {llm_client['retries']} retries, "
+              f"{llm_client['failures']} failed attempts, {llm_client['rejected_open_circuit']} rejected by the circuit "
+              f"breaker (now {llm_client['circuit']['state']}, transitions {llm_client['circuit']['transitions']})")
+    for name, stats in report["endpoints"].items():
+        if stats["error_rate"]:
+            print(f"{name} statuses: {stats['statuses']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test for the DocuMend API")
+    parser.add_argument("--base-url", help="Target an already running server instead of starting one")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients (default: 8)")
+    parser.add_argument("--duration", type=float, default=60, help="Test duration in seconds (default: 60)")
+    parser.add_argument("--requests", type=int, default=-1, help="Stop after this many requests (default: no limit)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Endpoint weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--documents", type=int, default=20,
+                        help="Synthetic documents per type; smaller pools mean more cache hits (default: 20)")
+    parser.add_argument("--pdf-pages", type=int, default=2, help="Pages per synthetic PDF (default: 2)")
+    parser.add_argument("--language", default="eng", help="OCR language sent to /ocr endpoints (default: eng)")
+    parser.add_argument("--timeout", type=float, default=120, help="Per-request timeout in seconds (default: 120)")
+    parser.add_argument("--llm-latency-ms", type=float, default=300, help="Mock Gemini mean latency (default: 300)")
+    parser.add_argument("--llm-jitter-ms", type=float, default=100, help="Mock Gemini latency jitter (default: 100)")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="Mock Gemini 429/500/503 rate (default: 0)")
+    parser.add_argument("--llm-malformed-rate", type=float, default=0.0, help="Mock Gemini malformed JSON rate (default: 0)")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the server's result cache")
+    parser.add_argument("--seed", type=int, default=1234, help="Random seed (default: 1234)")
+    parser.add_argument("--json-out", help="Write the report as JSON to this file")
+    parser.add_argument("--max-error-rate", type=float, help="Fail if the overall error rate exceeds this fraction")
+    parser.add_argument("--max-p99-ms", type=float, help="Fail if the overall p99 latency exceeds this")
+    parser.add_argument("--max-loop-lag-ms", type=float,
+                        help="Fail if the p99 event-loop lag exceeds this (server-reported when available)")
+    args = parser.parse_args()
+
+    weights = parse_mix(args.mix)
+    print(f"Generating {args.documents} synthetic documents per type...")
+    documents = build_documents(args.documents, args.pdf_pages, args.seed)
+
+    mock_server = None
+    app_process = None
+    with tempfile.TemporaryDirectory(prefix="documend-loadtest-") as scratch_dir:
+        try:
+            base_url = args.base_url
+            if base_url is None:
+                mock_server = start_mock_gemini(config=MockGeminiConfig(
+                    args.llm_latency_ms, args.llm_jitter_ms, args.llm_error_rate, args.llm_malformed_rate, args.seed
+                ))
+                mock_url = f"http://127.0.0.1:{mock_server.server_port}"
+                extra_env = {"RESULT_CACHE_ENABLED": "false"} if args.no_cache else {}
+                app_process, base_url = start_app(mock_url, scratch_dir, extra_env)
+                print(f"Mock Gemini at {mock_url}, app at {base_url}")
+            wait_until_ready(base_url)
+
+            # Idle round trip to /ready, subtracted from probes taken under load
+            idle = []
+            for _ in range(10):
+                started = time.perf_counter()
+                requests.get(f"{base_url}/ready", timeout=10)
+                idle.append(time.perf_counter() - started)
+            lag_baseline = percentile(idle, 50)
+
+            recorder = Recorder()
+            lag_samples: List[float] = []
+            stop = threading.Event()
+            prober = threading.Thread(target=probe_loop_lag, args=(base_url, stop, lag_samples, 0.1), daemon=True)
+            prober.start()
+
+            print(f"Running {args.concurrency} clients for up to {args.duration:.0f}s with mix {weights}...")
+            remaining = [args.requests]
+            remaining_lock = threading.Lock()
+            started = time.monotonic()
+            deadline = started + args.duration
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                for worker_id in range(args.concurrency):
+                    pool.submit(run_worker, worker_id, base_url, weights, documents, recorder, deadline,
+                                remaining, remaining_lock, args.language, args.timeout, args.seed)
+            elapsed = time.monotonic() - started
+            stop.set()
+            prober.join()
+            server_metrics = fetch_server_metrics(base_url)
+        finally:
+            if app_process is not None:
+                app_process.terminate()
+                try:
+                    app_process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    app_process.kill()
+            if mock_server is not None:
+                mock_server.shutdown()
+
+    report = summarize(recorder, elapsed, lag_samples, lag_baseline, server_metrics)
+    print_report(report)
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report saved to: {args.json_out}")
+
+    failures = []
+    if args.max_error_rate is not None and report["overall"]["error_rate"] > args.max_error_rate:
+        failures.append(f"error rate {report['overall']['error_rate']:.2%} > {args.max_error_rate:.2%}")
+    if args.max_p99_ms is not None and report["overall"]["latency_ms"]["p99"] > args.max_p99_ms:
+        failures.append(f"p99 {report['overall']['latency_ms']['p99']} ms > {args.max_p99_ms} ms")
+    if args.max_loop_lag_ms is not None:
+        server_loop = report.get("server_event_loop")
+        loop_p99 = server_loop["lag_ms"]["p99"] if server_loop else report["event_loop_lag_ms"]["p99"]
+        if loop_p99 > args.max_loop_lag_ms:
+            failures.append(f"event-loop lag p99 {loop_p99} ms > {args.max_loop_lag_ms} ms")
+    if failures:
+        print("FAIL: " + "; ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Gemini REST API, for offline load and fault testing.
+
+Answers POST /v1beta/models/<model>:generateContent with canned responses
+shaped like the real API, with injectable latency, error rate and
+malformed-JSON rate. Point the backend at it with:
+
+  GEMINI_API_ENDPOINT=http://127.0.0.1:8089 GOOGLE_API_KEY=test uvicorn app:app
+
+Usage: cd backend && python scripts/mock_gemini.py [--port 8089] [--latency-ms 300] [--error-rate 0.05]
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+# (HTTP status, Google API status) pairs used for injected failures
+INJECTED_ERRORS = [
+    (429, "RESOURCE_EXHAUSTED"),
+    (500, "INTERNAL"),
+    (503, "UNAVAILABLE"),
+]
+
+
+class MockGeminiConfig:
+    def __init__(
+        self,
+        latency_ms: float = 300,
+        jitter_ms: float = 100,
+        error_rate: float = 0.0,
+        malformed_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "malformed": 0}
+
+    def roll(self, rate: float) -> bool:
+        with self.lock:
+            return self.random.random() < rate
+
+    def delay(self) -> float:
+        with self.lock:
+            jitter = self.random.uniform(-self.jitter_ms, self.jitter_ms)
+        return max(0.0, self.latency_ms + jitter) / 1000.0
+
+    def count(self, key: str):
+        with self.lock:
+            self.stats[key] += 1
+
+
+def _prompt_text(body: dict) -> str:
+    parts = []
+    for content in body.get("contents", []):
+        for part in content.get("parts", []):
+            parts.append(part.get("text", ""))
+    return "\n".join(parts)
+
+
+def _reply_for(prompt: str, malformed: bool) -> str:
+    """Canned reply matching what each backend prompt expects"""
+    if "Classification:" in prompt:
+        return "general"
+    if "JSON" in prompt:
+        if malformed:
+            return "Sure! Here is the data you asked for: {document_type: general,"
+        # Echo back the template structure embedded in the prompt
+        start = prompt.find("{")
+        try:
+            reply = json.JSONDecoder().raw_decode(prompt[start:])[0] if start != -1 else {}
+        except json.JSONDecodeError:
+            reply = {}
+        if isinstance(reply, dict) and "document_type" in reply:
+            reply["document_type"] = reply["document_type"] or "general"
+        return "```json\n" + json.dumps(reply) + "\n```"
+    return "Mock summary of the provided content."
+
+
+def make_handler(config: MockGeminiConfig):
+    class MockGeminiHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, payload: dict):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/stats":
+                self._send(200, config.stats)
+            else:
+                self._send(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            raw = self.rfile.read(length) if length else b"{}"
+            config.count("requests")
+
+            if ":generateContent" not in self.path:
+                self._send(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+                return
+
+            time.sleep(config.delay())
+
+            if config.roll(config.error_rate):
+                config.count("errors")
+                with config.lock:
+                    status, reason = config.random.choice(INJECTED_ERRORS)
+                self._send(status, {"error": {"code": status, "message": "Injected failure", "status": reason}})
+                return
+
+            try:
+                body = json.loads(raw or b"{}")
+            except json.JSONDecodeError:
+                self._send(400, {"error": {"code": 400, "message": "Invalid JSON", "status": "INVALID_ARGUMENT"}})
+                return
+
+            malformed = config.roll(config.malformed_rate)
+            if malformed:
+                config.count("malformed")
+            text = _reply_for(_prompt_text(body), malformed)
+            self._send(200, {
+                "candidates": [{
+                    "content": {"parts": [{"text": text}], "role": "model"},
+                    "finishReason": "STOP",
+                    "index": 0,
+                }],
+                "usageMetadata": {
+                    "promptTokenCount": length // 4,
+                    "candidatesTokenCount": len(text) // 4,
+                    "totalTokenCount": (length + len(text)) // 4,
+                },
+            })
+
+    return MockGeminiHandler
+
+
+def start_mock_gemini(host: str = "127.0.0.1", port: int = 0, config: Optional[MockGeminiConfig] = None) -> ThreadingHTTPServer:
+    """Start the mock server on a background thread and return it; port 0 picks a free port"""
+    server = ThreadingHTTPServer((host, port), make_handler(config or MockGeminiConfig()))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-gemini", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Gemini API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=300, help="Mean response latency (default: 300)")
+    parser.add_argument("--jitter-ms", type=float, default=100, help="Uniform latency jitter (default: 100)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls failing with 429/500/503")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Fraction of JSON replies that are malformed")
+    parser.add_argument("--seed", type=int, help="Random seed for reproducible fault injection")
+    args = parser.parse_args()
+
+    config = MockGeminiConfig(args.latency_ms, args.jitter_ms, args.error_rate, args.malformed_rate, args.seed)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(config))
+    print(f"Mock Gemini listening on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+import asyncio
+import contextvars
+import hashlib
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, Optional
+
+from config import Settings, get_settings
+
+
+class AdmissionRejected(Exception):
+    """Raised when a stage is saturated and the request should be retried later"""
+
+    def __init__(self, stage: str, status_code: int, retry_after: float, detail: str):
+        super().__init__(detail)
+        self.stage = stage
+        self.status_code = status_code
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.detail = detail
+
+
+class TokenBucket:
+    """
+    Token bucket that reserves a token and reports how long to wait for it.
+
+    Thread-safe: LLM retries reserve tokens from executor threads.
+    """
+
+    def __init__(self, rate_per_second: float, capacity: float):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        """Reserve one token. Returns the wait in seconds, or None if it exceeds max_wait."""
+        with self.lock:
+            self._refill()
+            wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+            if wait > max_wait:
+                return None
+            self.tokens -= 1
+            return wait
+
+    def time_until_available(self) -> float:
+        with self.lock:
+            self._refill()
+            return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+
+class StageLimiter:
+    """Bounded concurrency for one pipeline stage with a bounded wait queue"""
+
+    def __init__(self, name: str, limit: int, max_queue: int, max_wait: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._semaphore = asyncio.Semaphore(limit)
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.max_queue_depth = 0
+        self.total_wait = 0.0
+        # Exponentially weighted average of how long a slot is held, for Retry-After
+        self.avg_service_time = 1.0
+
+    def estimated_wait(self) -> float:
+        return self.avg_service_time * (self.waiting + 1) / self.limit
+
+    def check_capacity(self):
+        """Fail fast if every slot is busy and the wait queue is already full"""
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise AdmissionRejected(
+                self.name, 503, self.estimated_wait(),
+                f"{self.name} capacity exhausted, please retry later"
+            )
+
+    @asynccontextmanager
+    async def slot(self):
+        queued_at = time.monotonic()
+        if self._semaphore.locked():
+            self.check_capacity()
+            self.waiting += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.waiting)
+            timed_out = False
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.max_wait)
+            except asyncio.TimeoutError:
+                timed_out = True
+            finally:
+                self.waiting -= 1
+            if timed_out:
+                # Estimated once this request has left the queue, so it is not counted twice
+                self.rejected += 1
+                raise AdmissionRejected(
+                    self.name, 503, self.estimated_wait(),
+                    f"Timed out after {self.max_wait:.0f}s waiting for {self.name} capacity"
+                )
+        else:
+            # A free slot is taken without suspending
+            await self._semaphore.acquire()
+
+        started = time.monotonic()
+        self.total_wait += started - queued_at
+        self.admitted += 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+            self.avg_service_time = 0.8 * self.avg_service_time + 0.2 * (time.monotonic() - started)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "max_queue_depth": self.max_queue_depth,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_wait_seconds": round(self.total_wait / self.admitted, 4) if self.admitted else 0.0,
+            "avg_service_seconds": round(self.avg_service_time, 4),
+        }
+
+
+class AdmissionController:
+    """
+    Admission control for the CPU-bound OCR stage and the rate-limited LLM stage.
+
+    Each stage has its own concurrency limit, wait queue and executor, and LLM
+    calls are additionally rate limited with a token bucket per API key.
+    """
+
+    def __init__(
+        self,
+        ocr_concurrency: int,
+        ocr_max_queue: int,
+        ocr_max_wait: float,
+        llm_concurrency: int,
+        llm_max_queue: int,
+        llm_max_wait: float,
+        llm_rate_per_minute: float,
+        llm_burst: float,
+    ):
+        self.ocr = StageLimiter("ocr", ocr_concurrency, ocr_max_queue, ocr_max_wait)
+        self.llm = StageLimiter("llm", llm_concurrency, llm_max_queue, llm_max_wait)
+        self.llm_rate_per_second = llm_rate_per_minute / 60.0
+        self.llm_burst = llm_burst
+        self.llm_rate_limited = 0
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._buckets_lock = threading.Lock()
+        self.ocr_executor = ThreadPoolExecutor(max_workers=ocr_concurrency, thread_name_prefix="ocr")
+        self.llm_executor = ThreadPoolExecutor(max_workers=llm_concurrency, thread_name_prefix="llm")
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "AdmissionController":
+        return cls(
+            ocr_concurrency=settings.ocr_concurrency,
+            ocr_max_queue=settings.ocr_max_queue,
+            ocr_max_wait=settings.ocr_max_wait,
+            llm_concurrency=settings.llm_concurrency,
+            llm_max_queue=settings.llm_max_queue,
+            llm_max_wait=settings.llm_max_wait,
+            llm_rate_per_minute=settings.llm_rate_per_minute,
+            llm_burst=settings.llm_burst,
+        )
+
+    def _bucket_for(self, api_key: Optional[str]) -> TokenBucket:
+        # Never keep raw API keys around, even in memory-only metrics
+        key = hashlib.sha256((api_key or "").encode()).hexdigest()[:12]
+        with self._buckets_lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(self.llm_rate_per_second, self.llm_burst)
+                self._buckets[key] = bucket
+        return bucket
+
+    def reserve_llm_call(self, max_wait: float, api_key: Optional[str] = None) -> Optional[float]:
+        """
+        Reserve an extra call from the API key's rate budget, e.g. for a retry.
+
+        Returns the wait in seconds, or None if the budget is spent for longer than max_wait.
+        """
+        bucket = self._bucket_for(api_key if api_key is not None else get_settings().google_api_key)
+        wait = bucket.reserve(max_wait)
+        if wait is None:
+            self.llm_rate_limited += 1
+        return wait
+
+    def check_capacity(self, stage: str):
+        """Reject a request up front if the given stage cannot take more work"""
+        if stage == "ocr":
+            self.ocr.check_capacity()
+        elif stage == "llm":
+            self.llm.check_capacity()
+
+    async def run_ocr(self, func: Callable, *args) -> Any:
+        """Run CPU-bound OCR work in the shared OCR executor once a slot is free"""
+        async with self.ocr.slot():
+            loop = asyncio.get_running_loop()
+            # Copy the context so request-scoped state (e.g. profiling) follows the work
+            return await loop.run_in_executor(self.ocr_executor, contextvars.copy_context().run, func, *args)
+
+    async def run_llm(self, func: Callable, *args, api_key: Optional[str] = None) -> Any:
+        """Run a blocking LLM call once a slot and the API key's rate budget allow it"""
+        bucket = self._bucket_for(api_key if api_key is not None else get_settings().google_api_key)
+        async with self.llm.slot():
+            # Reserved only once a slot is granted, so calls rejected for capacity spend no budget
+            wait = bucket.reserve(self.llm.max_wait)
+            if wait is None:
+                self.llm_rate_limited += 1
+                raise AdmissionRejected(
+                    "llm", 429, bucket.time_until_available(),
+                    "LLM rate limit reached, please retry later"
+                )
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.llm_executor, contextvars.copy_context().run, func, *args)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "ocr": self.ocr.metrics(),
+            "llm": {
+                **self.llm.metrics(),
+                "rate_limited": self.llm_rate_limited,
+                "rate_per_minute": self.llm_rate_per_second * 60,
+                "burst": self.llm_burst,
+            },
+        }
+
+
+admission_controller = AdmissionController.from_settings(get_settings())
@@ -1,8 +1,4 @@
-import os
-import google.generativeai as genai
-from dotenv import load_dotenv
-
-load_dotenv()
+from services.llm_client import LLMUnavailable, get_llm_client
 
 def generate_summary(content: str, template: str) -> str:
     """Generate summary using the template"""
@@ -17,9 +13,9 @@ def generate_summary(content: str, template: str) -> str:
     """
     
     try:
-        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        response = model.generate_content(prompt)
-        return response.text
+        return get_llm_client().generate(prompt)
+    except LLMUnavailable:
+        # The router answers 503 with Retry-After instead of a summary
+        raise
     except Exception as e:
-        return f"Error generating summary: {str(e)}"
\ No newline at end of file
+        return f"Error generating summary: {str(e)}"
@@ -0,0 +1,229 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from config import get_settings
+
+# Full-text index over pages.text. It is an external-content table keyed by
+# pages.id (an INTEGER PRIMARY KEY, so VACUUM never renumbers it) and kept in
+# sync by triggers, so replacing a document's pages removes exactly their
+# index entries instead of scanning the index.
+FTS_SCHEMA = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5 (text, content='pages', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS pages_fts_insert AFTER INSERT ON pages BEGIN"
+    " INSERT INTO pages_fts (rowid, text) VALUES (new.id, new.text); END",
+    "CREATE TRIGGER IF NOT EXISTS pages_fts_delete AFTER DELETE ON pages BEGIN"
+    " INSERT INTO pages_fts (pages_fts, rowid, text) VALUES ('delete', old.id, old.text); END",
+    "CREATE TRIGGER IF NOT EXISTS pages_fts_update AFTER UPDATE ON pages BEGIN"
+    " INSERT INTO pages_fts (pages_fts, rowid, text) VALUES ('delete', old.id, old.text);"
+    " INSERT INTO pages_fts (rowid, text) VALUES (new.id, new.text); END",
+)
+
+
+class DocumentStore:
+    """
+    Persistent store of processed documents with a full-text index.
+
+    Documents are keyed by the SHA-256 of the uploaded file. OCR text is kept
+    per page and indexed with SQLite FTS5, so past documents can be searched
+    and retrieved without re-uploading or re-processing them.
+
+    Each stage's output is stored with the fingerprint of the configuration
+    that produced it (OCREngine.fingerprint, ocr_service.llm_fingerprint), so
+    "cli_ocr.py reprocess" can recompute only the stale stages.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS documents (
+                    doc_hash TEXT PRIMARY KEY,
+                    filename TEXT,
+                    file_type TEXT,
+                    language TEXT,
+                    page_count INTEGER NOT NULL,
+                    text_length INTEGER NOT NULL,
+                    document_classification TEXT,
+                    structured_data TEXT,
+                    ocr_fingerprint TEXT,
+                    llm_fingerprint TEXT,
+                    created REAL NOT NULL,
+                    updated REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS pages (
+                    id INTEGER PRIMARY KEY,
+                    doc_hash TEXT NOT NULL,
+                    page_number INTEGER NOT NULL,
+                    text TEXT NOT NULL,
+                    UNIQUE (doc_hash, page_number)
+                );
+                """
+            )
+            for statement in FTS_SCHEMA:
+                conn.execute(statement)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def save(
+        self,
+        doc_hash: str,
+        pages: List[str],
+        filename: Optional[str] = None,
+        file_type: Optional[str] = None,
+        language: Optional[str] = None,
+        document_classification: Optional[str] = None,
+        structured_data: Optional[Dict[str, Any]] = None,
+        ocr_fingerprint: Optional[str] = None,
+        llm_fingerprint: Optional[str] = None,
+    ):
+        """
+        Insert or replace a document and its per-page text.
+
+        An existing classification and structured data (and their fingerprint)
+        are kept when none is given.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT created, document_classification, structured_data, llm_fingerprint"
+                " FROM documents WHERE doc_hash = ?",
+                (doc_hash,),
+            ).fetchone()
+            stored_data = json.dumps(structured_data, ensure_ascii=False) if structured_data is not None else None
+            if row is not None and stored_data is None:
+                document_classification = document_classification or row["document_classification"]
+                stored_data = row["structured_data"]
+                llm_fingerprint = llm_fingerprint or row["llm_fingerprint"]
+            conn.execute(
+                "INSERT OR REPLACE INTO documents (doc_hash, filename, file_type, language, page_count,"
+                " text_length, document_classification, structured_data, ocr_fingerprint, llm_fingerprint,"
+                " created, updated)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    doc_hash, filename, file_type, language, len(pages),
+                    sum(len(page) for page in pages), document_classification, stored_data,
+                    ocr_fingerprint, llm_fingerprint, row["created"] if row else now, now,
+                ),
+            )
+            conn.execute("DELETE FROM pages WHERE doc_hash = ?", (doc_hash,))
+            page_rows = [(doc_hash, number, text) for number, text in enumerate(pages, start=1)]
+            conn.executemany("INSERT INTO pages (doc_hash, page_number, text) VALUES (?, ?, ?)", page_rows)
+
+    def update_analysis(
+        self,
+        doc_hash: str,
+        document_classification: Optional[str],
+        structured_data: Optional[Dict[str, Any]],
+        llm_fingerprint: Optional[str] = None,
+    ):
+        """Replace the structured LLM output of an existing document"""
+        stored_data = json.dumps(structured_data, ensure_ascii=False) if structured_data is not None else None
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE documents SET document_classification = ?, structured_data = ?, llm_fingerprint = ?,"
+                " updated = ? WHERE doc_hash = ?",
+                (
+                    document_classification, stored_data, llm_fingerprint, time.time(), doc_hash,
+                ),
+            )
+
+    def stale_llm_documents(self, llm_fingerprint: str) -> List[str]:
+        """Hashes of documents whose LLM analysis is missing or has a different fingerprint"""
+        rows = self._connect().execute(
+            "SELECT doc_hash FROM documents WHERE llm_fingerprint IS NULL OR llm_fingerprint != ?"
+            " ORDER BY created",
+            (llm_fingerprint,),
+        ).fetchall()
+        return [row["doc_hash"] for row in rows]
+
+    def get(self, doc_hash: str, include_pages: bool = True) -> Optional[Dict[str, Any]]:
+        conn = self._connect()
+        row = conn.execute("SELECT * FROM documents WHERE doc_hash = ?", (doc_hash,)).fetchone()
+        if row is None:
+            return None
+
+        document = dict(row)
+        document["document_hash"] = document.pop("doc_hash")
+        if document["structured_data"] is not None:
+            document["structured_data"] = json.loads(document["structured_data"])
+        if include_pages:
+            document["pages"] = [
+                page["text"] for page in conn.execute(
+                    "SELECT text FROM pages WHERE doc_hash = ? ORDER BY page_number", (doc_hash,)
+                )
+            ]
+        return document
+
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Full-text search over page text.
+
+        Each whitespace-separated term is matched literally (all terms must
+        appear on the page). Results are ranked by BM25, best first.
+        """
+        terms = ['"' + term.replace('"', '""') + '"' for term in query.split()]
+        if not terms:
+            return []
+
+        rows = self._connect().execute(
+            "SELECT p.doc_hash, p.page_number, snippet(pages_fts, 0, '[', ']', '...', 16) AS snippet,"
+            " bm25(pages_fts) AS score, d.filename, d.file_type, d.document_classification"
+            " FROM pages_fts JOIN pages AS p ON p.id = pages_fts.rowid"
+            " JOIN documents AS d ON d.doc_hash = p.doc_hash"
+            " WHERE pages_fts MATCH ? ORDER BY score LIMIT ?",
+            (" ".join(terms), limit),
+        ).fetchall()
+        return [
+            {
+                "document_hash": row["doc_hash"],
+                "page_number": int(row["page_number"]),
+                "filename": row["filename"],
+                "file_type": row["file_type"],
+                "document_classification": row["document_classification"],
+                "snippet": row["snippet"],
+                "score": round(-row["score"], 4),
+            }
+            for row in rows
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        conn = self._connect()
+        return {
+            "path": self.path,
+            "documents": conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0],
+            "pages": conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0],
+        }
+
+
+_document_store: Optional[DocumentStore] = None
+_document_store_lock = threading.Lock()
+
+
+def get_document_store() -> Optional[DocumentStore]:
+    """Return the process-wide document store, or None if it is disabled"""
+    global _document_store
+    settings = get_settings()
+    if not settings.document_store_enabled:
+        return None
+    if _document_store is None:
+        with _document_store_lock:
+            if _document_store is None:
+                _document_store = DocumentStore(settings.document_store_path)
+    return _document_store
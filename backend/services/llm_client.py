@@ -0,0 +1,333 @@
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from config import Settings, get_settings
+from services.profiling import stage
+
+# google.generativeai is imported on first use to keep startup fast
+
+# HTTP statuses worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Transient error types from google.api_core, requests and urllib3, matched by
+# name so none of them has to be imported here
+RETRYABLE_ERROR_NAMES = {
+    "ResourceExhausted", "TooManyRequests", "InternalServerError", "BadGateway",
+    "ServiceUnavailable", "GatewayTimeout", "DeadlineExceeded", "RetryError",
+    "ConnectionError", "Timeout", "ReadTimeout", "ConnectTimeout", "ProtocolError",
+}
+
+
+class LLMUnavailable(Exception):
+    """Raised when the circuit is open, the deadline has passed or retries are exhausted"""
+
+    def __init__(self, detail: str, retry_after: float = 1.0):
+        super().__init__(detail)
+        # Seconds until a new call is worth trying
+        self.retry_after = retry_after
+
+
+def is_transient(error: Exception) -> bool:
+    """Whether a failed call is worth retrying and counts against the upstream's health"""
+    status = getattr(error, "code", None)
+    if not isinstance(status, int):
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if status in RETRYABLE_STATUS_CODES:
+        return True
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    return any(cls.__name__ in RETRYABLE_ERROR_NAMES for cls in type(error).__mro__)
+
+
+class CircuitBreaker:
+    """
+    Fails LLM calls fast while the upstream is degraded.
+
+    Closed: calls pass and their outcomes are tracked over a sliding window.
+    When at least min_calls outcomes are in the window and the failure rate
+    reaches failure_rate, the circuit opens and calls are rejected without
+    contacting the upstream. After cooldown seconds it is half-open: one probe
+    call is let through, and its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_rate: float = 0.5, min_calls: int = 10, window: float = 60.0, cooldown: float = 30.0):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.outcomes: Deque[Tuple[float, bool]] = deque()
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.short_circuited = 0
+        self.transitions: Dict[str, int] = {}
+        self.last_transition: Optional[float] = None
+        self.lock = threading.Lock()
+
+    def _transition(self, new_state: str):
+        key = f"{self.state}->{new_state}"
+        self.transitions[key] = self.transitions.get(key, 0) + 1
+        self.last_transition = time.time()
+        print(f"LLM circuit breaker: {self.state} -> {new_state}")
+        self.state = new_state
+        if new_state == self.OPEN:
+            self.opened_at = time.monotonic()
+        self.outcomes.clear()
+
+    def is_open(self) -> bool:
+        """True while calls would be rejected, without claiming the half-open probe"""
+        with self.lock:
+            if self.state == self.OPEN:
+                return time.monotonic() - self.opened_at < self.cooldown
+            return self.state == self.HALF_OPEN and self.probe_in_flight
+
+    def retry_after(self) -> float:
+        """Seconds until the open circuit lets a probe call through"""
+        with self.lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+
+    def allow(self) -> bool:
+        """Whether a call may go to the upstream now; a True in half-open state claims the probe"""
+        with self.lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.cooldown:
+                    self.short_circuited += 1
+                    return False
+                self._transition(self.HALF_OPEN)
+            if self.state == self.HALF_OPEN:
+                if self.probe_in_flight:
+                    self.short_circuited += 1
+                    return False
+                self.probe_in_flight = True
+            return True
+
+    def record(self, success: bool):
+        with self.lock:
+            if self.state == self.HALF_OPEN:
+                self.probe_in_flight = False
+                self._transition(self.CLOSED if success else self.OPEN)
+                return
+            if self.state == self.OPEN:
+                # A call admitted before the circuit opened
+                return
+
+            now = time.monotonic()
+            self.outcomes.append((now, success))
+            while self.outcomes and now - self.outcomes[0][0] > self.window:
+                self.outcomes.popleft()
+            failures = sum(1 for _, ok in self.outcomes if not ok)
+            if len(self.outcomes) >= self.min_calls and failures / len(self.outcomes) >= self.failure_rate:
+                self._transition(self.OPEN)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self.lock:
+            failures = sum(1 for _, ok in self.outcomes if not ok)
+            return {
+                "state": self.state,
+                "window_calls": len(self.outcomes),
+                "window_failures": failures,
+                "short_circuited": self.short_circuited,
+                "transitions": dict(self.transitions),
+                "last_transition": self.last_transition,
+            }
+
+
+class LLMClient:
+    """
+    The process-wide Gemini client shared by OCR analysis and summarization.
+
+    One model object is created per process and reused, so the underlying
+    gRPC channel or HTTP session (and its connections) is shared by all calls.
+    Every call has a deadline covering all of its attempts; transient errors
+    (429 and 5xx, timeouts, dropped connections) are retried with exponential
+    backoff and full jitter, and a circuit breaker fails calls fast while the
+    upstream keeps failing. Callers admit the first attempt against the API
+    key's rate budget; retries reserve their own calls through reserve_call.
+    """
+
+    def __init__(
+        self,
+        settings: Settings,
+        timeout: float = 30.0,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        breaker: Optional[CircuitBreaker] = None,
+        reserve_call: Optional[Callable[[float], Optional[float]]] = None,
+    ):
+        """
+        - **reserve_call**: Reserves a retry from the rate budget; called with the
+          longest acceptable wait, returns the wait or None if the budget is spent
+        """
+        self.settings = settings
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.reserve_call = reserve_call
+        self.json_mode_supported = True
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._counts_lock = threading.Lock()
+        self.counts = {
+            "calls": 0,
+            "successes": 0,
+            "failures": 0,
+            "retries": 0,
+            "retries_rate_limited": 0,
+            "deadline_exceeded": 0,
+            "rejected_open_circuit": 0,
+        }
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "LLMClient":
+        from services.admission import admission_controller
+
+        return cls(
+            settings,
+            timeout=settings.llm_timeout,
+            max_retries=settings.llm_max_retries,
+            backoff_base=settings.llm_backoff_base,
+            backoff_max=settings.llm_backoff_max,
+            breaker=CircuitBreaker(
+                failure_rate=settings.llm_breaker_failure_rate,
+                min_calls=settings.llm_breaker_min_calls,
+                window=settings.llm_breaker_window,
+                cooldown=settings.llm_breaker_cooldown,
+            ),
+            reserve_call=admission_controller.reserve_llm_call,
+        )
+
+    def model(self):
+        """Return the Gemini model, configuring the client on first use"""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    import google.generativeai as genai
+
+                    if self.settings.gemini_api_endpoint:
+                        genai.configure(
+                            api_key=self.settings.google_api_key,
+                            transport="rest",
+                            client_options={"api_endpoint": self.settings.gemini_api_endpoint},
+                        )
+                    else:
+                        genai.configure(api_key=self.settings.google_api_key)
+                    self._model = genai.GenerativeModel(self.settings.gemini_model)
+        return self._model
+
+    def _count(self, key: str):
+        with self._counts_lock:
+            self.counts[key] += 1
+
+    def _call(self, prompt: str, json_mode: bool, timeout: float):
+        model = self.model()
+        request_options = {"timeout": timeout}
+        if json_mode and self.json_mode_supported:
+            try:
+                return model.generate_content(
+                    prompt,
+                    generation_config={"response_mime_type": "application/json"},
+                    request_options=request_options,
+                )
+            except (TypeError, ValueError, AttributeError) as e:
+                # Older google-generativeai releases reject response_mime_type
+                print(f"Warning: JSON mode unavailable, falling back to plain prompts: {e}")
+                self.json_mode_supported = False
+        return model.generate_content(prompt, request_options=request_options)
+
+    def generate(self, prompt: str, json_mode: bool = False, timeout: Optional[float] = None) -> str:
+        """
+        Return the model's text response to a prompt.
+
+        - **json_mode**: Ask for a JSON response where the client supports it
+        - **timeout**: Deadline in seconds for the whole call, retries included (default: LLM_TIMEOUT)
+
+        Raises LLMUnavailable when the circuit is open, the deadline passes or
+        transient errors persist; other errors are raised as they are.
+        """
+        self._count("calls")
+        deadline = time.monotonic() + (timeout or self.timeout)
+        attempt = 0
+        with stage("llm"):
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._count("deadline_exceeded")
+                    raise LLMUnavailable("LLM call deadline exceeded")
+                if not self.breaker.allow():
+                    self._count("rejected_open_circuit")
+                    raise LLMUnavailable(
+                        "LLM is temporarily unavailable (circuit open after repeated failures)",
+                        retry_after=self.breaker.retry_after() or 1.0,
+                    )
+
+                try:
+                    text = self._call(prompt, json_mode, remaining).text
+                except Exception as e:
+                    transient = is_transient(e)
+                    # A non-transient error still means the upstream answered
+                    self.breaker.record(not transient)
+                    self._count("failures")
+                    if not transient:
+                        raise
+
+                    attempt += 1
+                    delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+                    if attempt > self.max_retries:
+                        raise LLMUnavailable(f"LLM call failed after {attempt} attempts: {e}", delay) from e
+                    if time.monotonic() + delay >= deadline:
+                        self._count("deadline_exceeded")
+                        raise LLMUnavailable(f"LLM call deadline exceeded after {attempt} attempt(s): {e}", delay) from e
+                    if self.reserve_call is not None:
+                        # A retry is another call against the API key's rate budget
+                        wait = self.reserve_call(deadline - time.monotonic() - delay)
+                        if wait is None:
+                            self._count("retries_rate_limited")
+                            raise LLMUnavailable(f"LLM rate budget spent, not retrying: {e}", delay) from e
+                        delay += wait
+                    self._count("retries")
+                    time.sleep(delay)
+                    continue
+
+                self.breaker.record(True)
+                self._count("successes")
+                return text
+
+    def is_available(self) -> bool:
+        """False while the circuit breaker is failing calls fast"""
+        return not self.breaker.is_open()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._counts_lock:
+            counts = dict(self.counts)
+        return {
+            **counts,
+            "timeout_seconds": self.timeout,
+            "max_retries": self.max_retries,
+            "circuit": self.breaker.metrics(),
+        }
+
+
+_llm_client: Optional[LLMClient] = None
+_llm_client_lock = threading.Lock()
+
+
+def get_llm_client() -> LLMClient:
+    """Return the process-wide LLM client"""
+    global _llm_client
+    if _llm_client is None:
+        with _llm_client_lock:
+            if _llm_client is None:
+                _llm_client = LLMClient.from_settings(get_settings())
+    return _llm_client
@@ -0,0 +1,134 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+
+class LoopMonitor:
+    """
+    Measures event-loop lag and reports callbacks that block the loop.
+
+    A heartbeat task sleeps for a fixed interval and records how late it wakes
+    up; that delay is the lag every other coroutine sees. A watchdog thread
+    checks the heartbeat and, when the loop has not run for longer than the
+    block threshold, captures the loop thread's current stack so the blocking
+    call can be identified while it is still running.
+    """
+
+    def __init__(self, interval: float = 0.1, block_threshold: float = 0.25, debug: bool = False, window: int = 600):
+        self.interval = interval
+        self.block_threshold = block_threshold
+        self.debug = debug
+        self.lag_samples: Deque[float] = deque(maxlen=window)
+        self.max_lag = 0.0
+        self.blocked_count = 0
+        self.recent_blocks: Deque[Dict[str, Any]] = deque(maxlen=20)
+        self._open_block: Optional[Dict[str, Any]] = None
+        self._last_beat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Start monitoring the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self.debug:
+            # asyncio then also logs every callback slower than the threshold
+            loop.set_debug(True)
+            loop.slow_callback_duration = self.block_threshold
+
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._heartbeat_task = loop.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+
+    async def _heartbeat(self):
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - started - self.interval)
+            self._last_beat = now
+            self.lag_samples.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            block = self._open_block
+            if block is not None:
+                # The loop is running again; record how long the stall lasted in total
+                block["blocked_for_seconds"] = round(lag, 3)
+                self._open_block = None
+
+    def _watch(self):
+        reported_beat = None
+        while not self._stop.wait(self.interval / 2):
+            last_beat = self._last_beat
+            stalled_for = time.monotonic() - last_beat - self.interval
+            if stalled_for < self.block_threshold or last_beat == reported_beat:
+                continue
+
+            # Report each stall once, with the stack of whatever is running on the loop
+            reported_beat = last_beat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = traceback.format_stack(frame) if frame is not None else []
+            block = {
+                "detected_at": time.time(),
+                "detected_after_seconds": round(stalled_for, 3),
+                "blocked_for_seconds": None,
+                "stack": [line.rstrip() for line in stack[-12:]],
+            }
+            self.blocked_count += 1
+            self.recent_blocks.append(block)
+            self._open_block = block
+            print(
+                f"Warning: event loop blocked for over {stalled_for * 1000:.0f} ms "
+                f"(threshold {self.block_threshold * 1000:.0f} ms). Loop thread stack:\n"
+                + "".join(stack[-12:])
+            )
+
+    def metrics(self) -> Dict[str, Any]:
+        samples: List[float] = sorted(self.lag_samples)
+
+        def at(p: float) -> float:
+            if not samples:
+                return 0.0
+            return samples[min(len(samples) - 1, int(p / 100.0 * len(samples)))]
+
+        return {
+            "interval_ms": round(self.interval * 1000, 1),
+            "block_threshold_ms": round(self.block_threshold * 1000, 1),
+            "lag_ms": {
+                "current": round(self.lag_samples[-1] * 1000, 2) if self.lag_samples else 0.0,
+                "p50": round(at(50) * 1000, 2),
+                "p99": round(at(99) * 1000, 2),
+                "max": round(self.max_lag * 1000, 2),
+            },
+            "blocked_count": self.blocked_count,
+            "recent_blocks": list(self.recent_blocks)[-5:],
+        }
+
+
+_loop_monitor: Optional[LoopMonitor] = None
+
+
+def get_loop_monitor() -> Optional[LoopMonitor]:
+    return _loop_monitor
+
+
+def start_loop_monitor(mode: str, interval: float, block_threshold: float) -> Optional[LoopMonitor]:
+    """Start monitoring the running loop. mode is "off", "on" or "debug"."""
+    global _loop_monitor
+    if mode == "off":
+        return None
+    _loop_monitor = LoopMonitor(interval=interval, block_threshold=block_threshold, debug=mode == "debug")
+    _loop_monitor.start()
+    return _loop_monitor
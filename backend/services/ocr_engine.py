@@ -0,0 +1,521 @@
+import contextvars
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, List, Optional, Tuple, Union
+
+from config import get_settings
+from services.admission import admission_controller
+from services.profiling import stage
+from services.result_cache import get_result_cache
+from utils.hash_utils import file_sha256
+from utils.json_utils import fingerprint
+
+# pytesseract, pdf2image and PIL are imported on first use to keep startup fast
+
+# Bump when a change to the extraction pipeline changes the OCR text it produces;
+# part of the OCR fingerprint, so cached and stored text is recomputed
+OCR_PIPELINE_VERSION = 1
+
+_tesseract_configured = False
+_page_executor: Optional[ThreadPoolExecutor] = None
+_page_executor_lock = threading.Lock()
+
+
+def configure_tesseract():
+    """Configure tesseract path for different environments"""
+    global _tesseract_configured
+    if _tesseract_configured:
+        return
+
+    import pytesseract
+
+    possible_paths = [
+        '/usr/bin/tesseract',  # Linux (Render)
+        '/usr/local/bin/tesseract',  # macOS
+        r'C:\Program Files\Tesseract-OCR\tesseract.exe',  # Windows
+    ]
+
+    for path in possible_paths:
+        if os.path.exists(path):
+            pytesseract.pytesseract.tesseract_cmd = path
+            break
+    else:
+        # If not found in common paths, try to find it using which/where
+        tesseract_path = shutil.which('tesseract')
+        if tesseract_path:
+            pytesseract.pytesseract.tesseract_cmd = tesseract_path
+    _tesseract_configured = True
+
+
+# Adaptive rasterization: pages are first rendered at PROBE_DPI to measure their
+# size and ink, then rendered for OCR at a DPI picked per page.
+PROBE_DPI = 36
+MIN_DPI = 100
+DEFAULT_DPI = 200
+DENSE_TEXT_DPI = 300
+# At PROBE_DPI text strokes average out to grey, small print to light grey, so
+# ink is any pixel darker than near-white, and pixels below DARK_LEVEL are the
+# strokes that stayed dark
+INK_LEVEL = 230
+DARK_LEVEL = 128
+# Neighbouring probe pixels differing by at least EDGE_DELTA are stroke edges
+EDGE_DELTA = 32
+# Share of inked probe pixels below which a page is treated as blank
+BLANK_INK_RATIO = 0.002
+# Pages with fewer edges per inked pixel are flat (photos, tints, grey scans)
+TEXTURE_EDGE_RATIO = 0.2
+# Textured pages whose ink has less than this share of dark pixels are small print
+SMALL_PRINT_DARK_RATIO = 0.1
+# Upper bound on pixels per rendered page, so posters and drawings stay affordable;
+# it takes precedence over the other limits
+MAX_PAGE_PIXELS = 40_000_000
+# With grayscale="auto", a page is rendered in color when more than this share
+# of its probe pixels have channels differing by at least COLOR_SPREAD
+COLOR_SPREAD = 32
+COLOR_PIXEL_RATIO = 0.01
+
+
+def measure_probe(image) -> Tuple[float, float, float]:
+    """
+    Measure a grayscale probe render.
+
+    Returns the share of inked pixels, the share of the ink that is dark, and
+    the number of stroke edges per inked pixel.
+    """
+    from PIL import ImageChops
+
+    histogram = image.histogram()
+    inked = sum(histogram[:INK_LEVEL])
+    ink_ratio = inked / max(sum(histogram), 1)
+    if not inked:
+        return ink_ratio, 0.0, 0.0
+
+    width, height = image.size
+    edges = 0
+    for shifted, base in (
+        (image.crop((1, 0, width, height)), image.crop((0, 0, width - 1, height))),
+        (image.crop((0, 1, width, height)), image.crop((0, 0, width, height - 1))),
+    ):
+        edges += sum(ImageChops.difference(shifted, base).histogram()[EDGE_DELTA:])
+    return ink_ratio, sum(histogram[:DARK_LEVEL]) / inked, edges / 2 / inked
+
+
+def choose_page_dpi(width_in: float, height_in: float, ink_ratio: float, dark_ratio: float, edge_ratio: float) -> int:
+    """
+    Pick a rasterization DPI for one page from its size and measure_probe().
+
+    Blank pages get MIN_DPI and pages with any ink at least DEFAULT_DPI; small
+    print gets DENSE_TEXT_DPI. MAX_PAGE_PIXELS caps the result.
+    """
+    if ink_ratio < BLANK_INK_RATIO:
+        dpi = MIN_DPI
+    elif edge_ratio >= TEXTURE_EDGE_RATIO and dark_ratio < SMALL_PRINT_DARK_RATIO:
+        dpi = DENSE_TEXT_DPI
+    else:
+        dpi = DEFAULT_DPI
+
+    area = max(width_in * height_in, 1e-6)
+    max_dpi = max(1, int((MAX_PAGE_PIXELS / area) ** 0.5))
+    return min(dpi, max_dpi)
+
+
+def page_has_color(image) -> bool:
+    """Whether an RGB probe render has enough colored pixels to be rasterized in color"""
+    from PIL import ImageChops
+
+    red, green, blue = image.split()
+    spread = ImageChops.lighter(ImageChops.difference(red, green), ImageChops.difference(green, blue))
+    histogram = spread.histogram()
+    return sum(histogram[COLOR_SPREAD:]) / max(sum(histogram), 1) > COLOR_PIXEL_RATIO
+
+
+def parse_dpi(value: Union[str, int, None]) -> Union[str, int]:
+    """Parse a DPI setting: "auto" or a positive integer"""
+    if value is None or str(value).lower() == "auto":
+        return "auto"
+    dpi = int(value)
+    if dpi <= 0:
+        raise ValueError(f"DPI must be positive or 'auto', got {value}")
+    return dpi
+
+
+def parse_grayscale(value: Union[str, bool, None]) -> Union[str, bool]:
+    """Parse a grayscale setting: a boolean, or "auto" to choose per page"""
+    if isinstance(value, bool):
+        return value
+    value = str(value).lower() if value is not None else "true"
+    if value == "auto":
+        return "auto"
+    return value in ("1", "true", "yes", "on")
+
+
+# Language packs to use for each script reported by tesseract's OSD, for
+# language="auto". Only the packs that are actually installed are used; Latin
+# script packs come from OCR_LATIN_LANGUAGES.
+SCRIPT_LANGUAGES = {
+    "Cyrillic": ["rus"],
+    "Greek": ["ell"],
+    "Arabic": ["ara"],
+    "Hebrew": ["heb"],
+    "Devanagari": ["hin"],
+    "Bengali": ["ben"],
+    "Tamil": ["tam"],
+    "Telugu": ["tel"],
+    "Kannada": ["kan"],
+    "Malayalam": ["mal"],
+    "Gujarati": ["guj"],
+    "Gurmukhi": ["pan"],
+    "Thai": ["tha"],
+    "Han": ["chi_sim", "chi_tra"],
+    "Japanese": ["jpn"],
+    "Katakana": ["jpn"],
+    "Hiragana": ["jpn"],
+    "Hangul": ["kor"],
+    "Korean": ["kor"],
+}
+FALLBACK_LANGUAGE = "eng"
+# Long side, in pixels, of the downsampled page used for script detection
+DETECTION_MAX_SIZE = 1600
+DETECTION_PDF_DPI = 150
+# Pages tried for script detection before falling back (blank covers are common)
+DETECTION_MAX_PAGES = 3
+
+
+@lru_cache(maxsize=1)
+def tesseract_version() -> str:
+    """The tesseract version, which is part of the OCR fingerprint"""
+    import pytesseract
+
+    configure_tesseract()
+    try:
+        return str(pytesseract.get_tesseract_version())
+    except Exception:
+        return "unknown"
+
+
+@lru_cache(maxsize=1)
+def installed_languages() -> Tuple[str, ...]:
+    """Language packs installed for tesseract, as reported by --list-langs"""
+    import pytesseract
+
+    configure_tesseract()
+    try:
+        return tuple(sorted(pytesseract.get_languages(config="")))
+    except Exception as e:
+        print(f"Warning: could not list tesseract languages: {e}")
+        return ()
+
+
+def languages_for_script(script: str) -> Optional[str]:
+    """Tesseract lang string for a detected script, limited to installed packs"""
+    installed = set(installed_languages())
+    if script == "Latin":
+        candidates = [lang.strip() for lang in get_settings().ocr_latin_languages.split(",") if lang.strip()]
+    else:
+        candidates = SCRIPT_LANGUAGES.get(script, [])
+    packs = [lang for lang in candidates if lang in installed]
+    if packs:
+        return "+".join(packs)
+    # Fall back to tesseract's generic model for the script, if present
+    if f"script/{script}" in installed:
+        return f"script/{script}"
+    return None
+
+
+def detect_script(image) -> Optional[str]:
+    """Run tesseract OSD on a downsampled copy of image and return the script name"""
+    import pytesseract
+
+    if "osd" not in installed_languages():
+        return None
+
+    probe = image.convert("L")
+    probe.thumbnail((DETECTION_MAX_SIZE, DETECTION_MAX_SIZE))
+    try:
+        osd = pytesseract.image_to_osd(probe, output_type=pytesseract.Output.DICT)
+    except pytesseract.TesseractError:
+        # OSD fails on pages with too little text
+        return None
+    finally:
+        probe.close()
+    return osd.get("script")
+
+
+def _get_page_executor() -> Optional[ThreadPoolExecutor]:
+    """Shared pool for OCRing the pages of one PDF in parallel, or None if disabled"""
+    global _page_executor
+    page_workers = get_settings().ocr_page_workers
+    if page_workers <= 1:
+        return None
+    if _page_executor is None:
+        with _page_executor_lock:
+            if _page_executor is None:
+                _page_executor = ThreadPoolExecutor(max_workers=page_workers, thread_name_prefix="ocr-page")
+    return _page_executor
+
+
+class OCREngine:
+    """
+    The single text extraction pipeline behind /ocr/* and /validate/pdf.
+
+    Results are cached by file content and language in the shared result
+    cache, and PDF pages are OCRed in parallel when page workers are enabled.
+    With language="auto" the script is detected per document first.
+    PDFs are rasterized to files in a scratch directory with pdftoppm's
+    multi-threaded conversion; with dpi="auto" each page gets a DPI chosen
+    from its size and ink coverage, and with grayscale="auto" pages are
+    rendered in color only when their probe render has color.
+    """
+
+    def __init__(
+        self,
+        language: str = "eng",
+        dpi: Union[str, int, None] = None,
+        raster_threads: Optional[int] = None,
+        grayscale: Union[str, bool, None] = None,
+    ):
+        settings = get_settings()
+        self.language = language
+        # The language actually used for OCR; with language="auto" it is
+        # detected per document by resolve_language()
+        self.ocr_language = None if language == "auto" else language
+        self.detected_script = None
+        self.dpi = parse_dpi(dpi if dpi is not None else settings.pdf_dpi)
+        self.raster_threads = raster_threads or settings.pdf_raster_threads
+        self.grayscale = parse_grayscale(settings.pdf_grayscale if grayscale is None else grayscale)
+        configure_tesseract()
+
+    def fingerprint(self, kind: str) -> str:
+        """
+        Identify everything that determines the OCR text of a document.
+
+        Call after resolve_language(). Stored and cached OCR text with a
+        different fingerprint is stale.
+        """
+        parts = {
+            "pipeline": OCR_PIPELINE_VERSION,
+            "tesseract": tesseract_version(),
+            "language": self.ocr_language,
+        }
+        if kind == "pdf":
+            # Rasterization settings change the OCR output, thread count does not
+            parts["dpi"] = self.dpi
+            parts["grayscale"] = self.grayscale
+        return fingerprint(parts)
+
+    def _cached(self, kind: str, file_hash: str, extract: Callable[[], Any]):
+        cache = get_result_cache()
+        if cache is None:
+            return extract()
+
+        key = f"ocr:{kind}:{self.fingerprint(kind)}:{file_hash}"
+        result = cache.get(key)
+        if result is None:
+            result = extract()
+            cache.set(key, result)
+        return result
+
+    def _store_cached(self, kind: str, file_hash: str, result):
+        cache = get_result_cache()
+        if cache is not None:
+            cache.set(f"ocr:{kind}:{self.fingerprint(kind)}:{file_hash}", result)
+
+    def _load_language(self, kind: str, file_hash: str) -> bool:
+        """Take the script detected earlier for this document from the result cache, if there is one"""
+        cache = get_result_cache()
+        decision = cache.get(f"lang:{kind}:{file_hash}") if cache is not None else None
+        if decision is None:
+            return False
+        self._set_script(decision["script"])
+        return True
+
+    def _set_script(self, script: Optional[str]):
+        self.detected_script = script
+        self.ocr_language = (languages_for_script(script) if script else None) or FALLBACK_LANGUAGE
+
+    def resolve_language(
+        self, kind: str, path: str, image_paths: Optional[List[str]] = None, file_hash: Optional[str] = None
+    ) -> str:
+        """
+        Settle the OCR language for a document.
+
+        With language="auto", tesseract's OSD detects the script on a
+        downsampled page and only the matching installed packs are used. The
+        detected script is cached per document in the result cache. For PDFs,
+        image_paths are pages already rendered for OCR to detect on; without
+        them the first pages are rendered just for detection. file_hash is
+        the file's SHA-256, if the caller has it already.
+        """
+        if self.ocr_language is not None:
+            return self.ocr_language
+        file_hash = file_hash or file_sha256(path)
+        if self._load_language(kind, file_hash):
+            return self.ocr_language
+
+        script = None
+        try:
+            with stage("detect_language"):
+                script = self._detect_document_script(kind, path, image_paths)
+        except Exception as e:
+            print(f"Warning: script detection failed for {path}: {e}")
+        cache = get_result_cache()
+        if cache is not None:
+            cache.set(f"lang:{kind}:{file_hash}", {"script": script})
+        self._set_script(script)
+        return self.ocr_language
+
+    def _detect_document_script(self, kind: str, path: str, image_paths: Optional[List[str]] = None) -> Optional[str]:
+        from PIL import Image
+
+        if kind == "image" or image_paths is not None:
+            for image_path in ([path] if kind == "image" else image_paths[:DETECTION_MAX_PAGES]):
+                with Image.open(image_path) as image:
+                    script = detect_script(image)
+                if script:
+                    return script
+            return None
+
+        from pdf2image import convert_from_path
+
+        for page_number in range(1, DETECTION_MAX_PAGES + 1):
+            pages = convert_from_path(
+                path, dpi=DETECTION_PDF_DPI, first_page=page_number, last_page=page_number, grayscale=True
+            )
+            if not pages:
+                break
+            script = detect_script(pages[0])
+            pages[0].close()
+            if script:
+                return script
+        return None
+
+    def _ocr_image(self, image) -> str:
+        import pytesseract
+
+        with stage("ocr"):
+            return pytesseract.image_to_string(image, lang=self.ocr_language)
+
+    def _ocr_image_file(self, image_path: str) -> str:
+        from PIL import Image
+
+        with Image.open(image_path) as image:
+            return self._ocr_image(image)
+
+    def extract_image_text(self, image_path: str, file_hash: Optional[str] = None) -> str:
+        """Extract text from a single image; file_hash is its SHA-256, if the caller has it"""
+        file_hash = file_hash or file_sha256(image_path)
+        self.resolve_language("image", image_path, file_hash=file_hash)
+        return self._cached("image", file_hash, lambda: self._extract_image_text(image_path))
+
+    def _extract_image_text(self, image_path: str) -> str:
+        import pytesseract
+
+        try:
+            return self._ocr_image_file(image_path)
+        except pytesseract.TesseractNotFoundError:
+            raise Exception("Tesseract OCR is not installed or not found in PATH.")
+        except Exception as e:
+            raise Exception(f"Error extracting text from image: {str(e)}")
+
+    def extract_pdf_pages(self, pdf_path: str, file_hash: Optional[str] = None) -> List[str]:
+        """
+        Extract the text of each page of a PDF by converting pages to images.
+
+        file_hash is the PDF's SHA-256, if the caller has it.
+        """
+        file_hash = file_hash or file_sha256(pdf_path)
+        if self.ocr_language is None and not self._load_language("pdf", file_hash):
+            # The script is detected on the pages rendered for OCR, so the
+            # cache key (which depends on the language) is only known afterwards
+            pages = self._extract_pdf_pages(pdf_path, file_hash)
+            self._store_cached("pdf", file_hash, pages)
+            return pages
+        return self._cached("pdf", file_hash, lambda: self._extract_pdf_pages(pdf_path, file_hash))
+
+    def _probe_pages(self, pdf_path: str) -> List[Tuple[int, bool]]:
+        """Render every page at a low DPI and choose an OCR DPI and color mode for each"""
+        from pdf2image import convert_from_path
+
+        probes = convert_from_path(
+            pdf_path, dpi=PROBE_DPI, grayscale=self.grayscale != "auto", thread_count=self.raster_threads
+        )
+        choices = []
+        for probe in probes:
+            grayscale = self.grayscale
+            if grayscale == "auto":
+                grayscale = not page_has_color(probe)
+                gray_probe = probe.convert("L")
+                probe.close()
+                probe = gray_probe
+
+            dpi = self.dpi
+            if dpi == "auto":
+                dpi = choose_page_dpi(probe.width / PROBE_DPI, probe.height / PROBE_DPI, *measure_probe(probe))
+            choices.append((dpi, grayscale))
+            probe.close()
+        return choices
+
+    def _rasterize_pdf(self, pdf_path: str, scratch_dir: str) -> List[str]:
+        """Render the PDF's pages to image files in scratch_dir, in page order"""
+        from pdf2image import convert_from_path
+
+        options = {
+            "output_folder": scratch_dir,
+            "paths_only": True,
+            "thread_count": self.raster_threads,
+        }
+        if self.dpi != "auto" and self.grayscale != "auto":
+            return convert_from_path(pdf_path, dpi=self.dpi, grayscale=self.grayscale, **options)
+
+        # Render consecutive pages that share a DPI and color mode in one pdftoppm run
+        runs: List[Tuple[int, int, Tuple[int, bool]]] = []
+        for page_number, choice in enumerate(self._probe_pages(pdf_path), start=1):
+            if runs and runs[-1][2] == choice and runs[-1][1] == page_number - 1:
+                runs[-1] = (runs[-1][0], page_number, choice)
+            else:
+                runs.append((page_number, page_number, choice))
+
+        paths: List[str] = []
+        for first_page, last_page, (dpi, grayscale) in runs:
+            paths.extend(convert_from_path(
+                pdf_path, dpi=dpi, grayscale=grayscale, first_page=first_page, last_page=last_page, **options
+            ))
+        return paths
+
+    def _extract_pdf_pages(self, pdf_path: str, file_hash: str) -> List[str]:
+        import pytesseract
+
+        try:
+            with tempfile.TemporaryDirectory(prefix="documend-raster-") as scratch_dir:
+                with stage("rasterize"):
+                    image_paths = self._rasterize_pdf(pdf_path, scratch_dir)
+                self.resolve_language("pdf", pdf_path, image_paths, file_hash)
+                executor = _get_page_executor()
+                if executor is not None and len(image_paths) > 1:
+                    futures = [
+                        executor.submit(contextvars.copy_context().run, self._ocr_image_file, path)
+                        for path in image_paths
+                    ]
+                    return [future.result() for future in futures]
+                return [self._ocr_image_file(path) for path in image_paths]
+        except pytesseract.TesseractNotFoundError:
+            raise Exception("Tesseract OCR is not installed or not found in PATH.")
+        except Exception as e:
+            raise Exception(f"Error extracting text from PDF: {str(e)}")
+
+    def extract_pdf_text(self, pdf_path: str) -> str:
+        """Extract the text of a whole PDF, pages separated by newlines"""
+        return "\n".join(self.extract_pdf_pages(pdf_path)).strip()
+
+    async def extract_image_text_async(self, image_path: str) -> str:
+        return await admission_controller.run_ocr(self.extract_image_text, image_path)
+
+    async def extract_pdf_pages_async(self, pdf_path: str) -> List[str]:
+        return await admission_controller.run_ocr(self.extract_pdf_pages, pdf_path)
+
+    async def extract_pdf_text_async(self, pdf_path: str) -> str:
+        return await admission_controller.run_ocr(self.extract_pdf_text, pdf_path)
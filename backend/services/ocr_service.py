@@ -1,65 +1,242 @@
-import pytesseract
-from pdf2image import convert_from_path
-from PIL import Image
-import tempfile
 import os
-import shutil
 import asyncio
+import contextvars
+import hashlib
 import re
-from concurrent.futures import ThreadPoolExecutor
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterable, List, Any, Optional, Union
 import json
+import time
 from datetime import datetime
-import google.generativeai as genai
-from dotenv import load_dotenv
+from config import get_settings
+from services.admission import AdmissionRejected, admission_controller
+from services.ocr_engine import OCREngine, configure_tesseract
+from services.document_store import get_document_store
+from services.llm_client import get_llm_client
+from services.profiling import stage
+from services.result_cache import get_result_cache
+from utils.hash_utils import file_sha256
+from utils.json_utils import conform_to_template, extract_first_json_object, fingerprint
+
+# Gemini calls go through the shared client in services/llm_client.py and OCR
+# itself lives in services/ocr_engine.py.
+
+# Extraction templates used by llm_enhanced_parsing, keyed by document type
+PARSING_TEMPLATES = {
+    "invoice": {
+        "document_type": "invoice/receipt",
+        "vendor_info": {
+            "name": "",
+            "address": "",
+            "phone": "",
+            "email": "",
+            "tax_id": ""
+        },
+        "customer_info": {
+            "name": "",
+            "address": "",
+            "phone": "",
+            "email": ""
+        },
+        "invoice_details": {
+            "invoice_number": "",
+            "date": "",
+            "due_date": "",
+            "po_number": ""
+        },
+        "line_items": [],
+        "totals": {
+            "subtotal": "",
+            "tax": "",
+            "total": "",
+            "amount_paid": "",
+            "balance_due": ""
+        }
+    },
+    "identity": {
+        "document_type": "identity_document",
+        "personal_info": {
+            "full_name": "",
+            "first_name": "",
+            "last_name": "",
+            "date_of_birth": "",
+            "place_of_birth": "",
+            "nationality": "",
+            "gender": ""
+        },
+        "document_details": {
+            "document_number": "",
+            "document_type": "",
+            "issuing_authority": "",
+            "issue_date": "",
+            "expiry_date": ""
+        },
+        "address": {
+            "street": "",
+            "city": "",
+            "state": "",
+            "country": "",
+            "postal_code": ""
+        }
+    },
+    "financial": {
+        "document_type": "financial_document",
+        "account_info": {
+            "account_holder": "",
+            "account_number": "",
+            "routing_number": "",
+            "institution_name": ""
+        },
+        "transaction_details": {
+            "transaction_id": "",
+            "date": "",
+            "amount": "",
+            "currency": "",
+            "description": "",
+            "reference_number": ""
+        },
+        "balances": {
+            "opening_balance": "",
+            "closing_balance": "",
+            "available_balance": ""
+        },
+        "period": {
+            "from_date": "",
+            "to_date": ""
+        }
+    },
+    "general": {
+        "document_type": "",
+        "key_entities": {
+            "names": [],
+            "organizations": [],
+            "locations": [],
+            "dates": [],
+            "amounts": [],
+            "contact_info": {
+                "emails": [],
+                "phones": [],
+                "addresses": []
+            }
+        },
+        "main_content": {
+            "summary": "",
+            "key_points": [],
+            "action_items": []
+        },
+        "metadata": {
+            "language": "",
+            "confidence_score": ""
+        }
+    }
+}
+
+# Text fields a processing result can include; "pages" is the raw OCR text of each page
+TEXT_FIELDS = ("raw_text", "processed_text", "pages")
+DEFAULT_TEXT_FIELDS = ("raw_text", "processed_text")
+
+# Prompts sent to the LLM. They are part of the LLM fingerprint, so editing one
+# recomputes cached and stored analyses.
+CLASSIFICATION_PROMPT = """
+        Analyze the following text and classify it into exactly one of these document types. 
+        Respond with only the single word classification, nothing else.
+
+        Document types:
+        - invoice (for invoices, receipts, bills, fee receipts)
+        - identity (for ID cards, passports, driver's licenses)
+        - financial (for bank statements, financial reports)
+        - general (for any other document type)
+
+        Text to classify:
+        {text}
+        
+        Classification:"""
+
+PARSING_PROMPT = """
+        You are an expert document analyzer. Extract information from the following text and return ONLY a valid JSON object.
+
+        Return the information in this exact JSON structure (fill empty strings with actual values if found, otherwise leave empty):
+        {structure}
+
+        Rules:
+        1. Return ONLY valid JSON, no explanations or additional text
+        2. Use empty strings "" for missing text values
+        3. Use empty arrays [] for missing list values
+        4. Be conservative - only extract information you are confident about
+        5. For amounts, include currency symbols if present
+        6. For dates, preserve the original format found in the document
+
+        Document text to analyze:
+        {text}
+        """
+
+# Sent once when the parsing response is not valid JSON
+REPAIR_PROMPT = """
+        The following response was supposed to be a single JSON object matching this structure:
+        {structure}
+
+        Return ONLY the corrected JSON object, with no explanations or markdown.
+
+        Response to repair:
+        {response}
+        """
+
+# A repair retry is only attempted if at least this much budget remains
+LLM_REPAIR_MIN_BUDGET = 5.0
+
+def llm_fingerprint() -> str:
+    """Identify everything besides the text that determines an LLM analysis"""
+    return fingerprint({
+        "prompts": [CLASSIFICATION_PROMPT, PARSING_PROMPT, REPAIR_PROMPT],
+        "model": get_settings().gemini_model,
+        "templates": PARSING_TEMPLATES,
+    })
 
-load_dotenv()
 
 class OCRService:
-    def __init__(self, language: str = "eng"):
+    def __init__(
+        self,
+        language: str = "eng",
+        dpi: Union[str, int, None] = None,
+        raster_threads: Optional[int] = None,
+        grayscale: Union[str, bool, None] = None,
+    ):
+        """
+        - **dpi**: PDF rasterization DPI, or "auto" to choose one per page
+        - **raster_threads**: pdftoppm threads used to rasterize a PDF
+        - **grayscale**: Rasterize PDF pages in grayscale, or "auto" to choose per page
+
+        Rasterization options default to the PDF_* settings in config.py.
+        """
         self.language = language
-        self.configure_tesseract()
+        self.engine = OCREngine(language=language, dpi=dpi, raster_threads=raster_threads, grayscale=grayscale)
         self.configure_genai()
     
     def configure_genai(self):
         """Configure Google Generative AI"""
         try:
-            genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-            self.model = genai.GenerativeModel('gemini-2.0-flash')
+            self.llm = get_llm_client()
+            self.llm.model()
         except Exception as e:
             print(f"Warning: Could not configure GenAI: {e}")
-            self.model = None
+            self.llm = None
     
     def configure_tesseract(self):
         """Configure tesseract path for different environments"""
-        possible_paths = [
-            '/usr/bin/tesseract',  # Linux (Render)
-            '/usr/local/bin/tesseract',  # macOS
-            r'C:\Program Files\Tesseract-OCR\tesseract.exe',  # Windows
-        ]
-        
-        for path in possible_paths:
-            if os.path.exists(path):
-                pytesseract.pytesseract.tesseract_cmd = path
-                return
-        
-        # If not found in common paths, try to find it using which/where
-        tesseract_path = shutil.which('tesseract')
-        if tesseract_path:
-            pytesseract.pytesseract.tesseract_cmd = tesseract_path
+        configure_tesseract()
 
     def clean_text(self, text: str) -> str:
         """Clean extracted text by removing extra spaces and line breaks"""
         if not text:
             return ""
         
-        # Remove extra whitespace and normalize line breaks
-        text = re.sub(r'\s+', ' ', text)
-        text = re.sub(r'\n\s*\n', '\n', text)
-        text = text.strip()
-        
-        # Remove special characters that might interfere with processing
-        text = re.sub(r'[^\w\s\.\,\:\;\-\(\)\[\]\/\@\#\$\%\&\*\+\=\?\!\<\>\|\{\}\"\']', '', text)
+        with stage("clean"):
+            # Remove extra whitespace and normalize line breaks
+            text = re.sub(r'\s+', ' ', text)
+            text = re.sub(r'\n\s*\n', '\n', text)
+            text = text.strip()
+            
+            # Remove special characters that might interfere with processing
+            text = re.sub(r'[^\w\s\.\,\:\;\-\(\)\[\]\/\@\#\$\%\&\*\+\=\?\!\<\>\|\{\}\"\']', '', text)
         
         return text
 
@@ -131,208 +308,55 @@ class OCRService:
 
     def extract_text_from_image(self, image_path: str) -> str:
         """Extract text from a single image"""
-        try:
-            image = Image.open(image_path)
-            text = pytesseract.image_to_string(image, lang=self.language)
-            return text
-        except pytesseract.TesseractNotFoundError:
-            raise Exception("Tesseract OCR is not installed or not found in PATH.")
-        except Exception as e:
-            raise Exception(f"Error extracting text from image: {str(e)}")
+        return self.engine.extract_image_text(image_path)
 
     def extract_text_from_pdf(self, pdf_path: str) -> str:
         """Extract text from PDF by converting to images"""
-        try:
-            images = convert_from_path(pdf_path)
-            full_text = ""
-            for img in images:
-                text = pytesseract.image_to_string(img, lang=self.language)
-                full_text += text + "\n"
-            return full_text.strip()
-        except pytesseract.TesseractNotFoundError:
-            raise Exception("Tesseract OCR is not installed or not found in PATH.")
-        except Exception as e:
-            raise Exception(f"Error extracting text from PDF: {str(e)}")
+        return self.engine.extract_pdf_text(pdf_path)
 
     def llm_enhanced_parsing(self, text: str, parsing_type: str = "general") -> Dict[str, Any]:
         """Use LLM to intelligently parse and structure the extracted text"""
-        if not self.model:
+        if not self.llm:
             return {"error": "LLM not configured"}
+
+        template_structure = PARSING_TEMPLATES.get(parsing_type, PARSING_TEMPLATES["general"])
         
-        # Define parsing templates based on document type
-        parsing_templates = {
-            "invoice": {
-                "document_type": "invoice/receipt",
-                "vendor_info": {
-                    "name": "",
-                    "address": "",
-                    "phone": "",
-                    "email": "",
-                    "tax_id": ""
-                },
-                "customer_info": {
-                    "name": "",
-                    "address": "",
-                    "phone": "",
-                    "email": ""
-                },
-                "invoice_details": {
-                    "invoice_number": "",
-                    "date": "",
-                    "due_date": "",
-                    "po_number": ""
-                },
-                "line_items": [],
-                "totals": {
-                    "subtotal": "",
-                    "tax": "",
-                    "total": "",
-                    "amount_paid": "",
-                    "balance_due": ""
-                }
-            },
-            "identity": {
-                "document_type": "identity_document",
-                "personal_info": {
-                    "full_name": "",
-                    "first_name": "",
-                    "last_name": "",
-                    "date_of_birth": "",
-                    "place_of_birth": "",
-                    "nationality": "",
-                    "gender": ""
-                },
-                "document_details": {
-                    "document_number": "",
-                    "document_type": "",
-                    "issuing_authority": "",
-                    "issue_date": "",
-                    "expiry_date": ""
-                },
-                "address": {
-                    "street": "",
-                    "city": "",
-                    "state": "",
-                    "country": "",
-                    "postal_code": ""
-                }
-            },
-            "financial": {
-                "document_type": "financial_document",
-                "account_info": {
-                    "account_holder": "",
-                    "account_number": "",
-                    "routing_number": "",
-                    "institution_name": ""
-                },
-                "transaction_details": {
-                    "transaction_id": "",
-                    "date": "",
-                    "amount": "",
-                    "currency": "",
-                    "description": "",
-                    "reference_number": ""
-                },
-                "balances": {
-                    "opening_balance": "",
-                    "closing_balance": "",
-                    "available_balance": ""
-                },
-                "period": {
-                    "from_date": "",
-                    "to_date": ""
-                }
-            },
-            "general": {
-                "document_type": "",
-                "key_entities": {
-                    "names": [],
-                    "organizations": [],
-                    "locations": [],
-                    "dates": [],
-                    "amounts": [],
-                    "contact_info": {
-                        "emails": [],
-                        "phones": [],
-                        "addresses": []
-                    }
-                },
-                "main_content": {
-                    "summary": "",
-                    "key_points": [],
-                    "action_items": []
-                },
-                "metadata": {
-                    "language": "",
-                    "confidence_score": ""
-                }
-            }
-        }
-        
-        template_structure = parsing_templates.get(parsing_type, parsing_templates["general"])
-        
-        prompt = f"""
-        You are an expert document analyzer. Extract information from the following text and return ONLY a valid JSON object.
+        # Limit text to prevent token overflow
+        prompt = PARSING_PROMPT.format(structure=json.dumps(template_structure, indent=2), text=text[:2000])
 
-        Return the information in this exact JSON structure (fill empty strings with actual values if found, otherwise leave empty):
-        {json.dumps(template_structure, indent=2)}
+        # LLM_TIMEOUT bounds the whole parse, including the repair retry
+        budget = self.llm.timeout
+        started = time.monotonic()
+        response_text = ""
+        try:
+            response_text = self.llm.generate(prompt, json_mode=True, timeout=budget)
+            result = extract_first_json_object(response_text)
 
-        Rules:
-        1. Return ONLY valid JSON, no explanations or additional text
-        2. Use empty strings "" for missing text values
-        3. Use empty arrays [] for missing list values
-        4. Be conservative - only extract information you are confident about
-        5. For amounts, include currency symbols if present
-        6. For dates, preserve the original format found in the document
+            remaining = budget - (time.monotonic() - started)
+            if result is None and remaining >= LLM_REPAIR_MIN_BUDGET:
+                # One targeted repair attempt instead of throwing away the OCR work. It
+                # is a second upstream call, so it needs its own share of the rate budget
+                wait = admission_controller.reserve_llm_call(remaining - LLM_REPAIR_MIN_BUDGET)
+                if wait is not None:
+                    time.sleep(wait)
+                    repair_prompt = REPAIR_PROMPT.format(
+                        structure=json.dumps(template_structure), response=response_text[:4000]
+                    )
+                    response_text = self.llm.generate(repair_prompt, json_mode=True, timeout=remaining - wait)
+                    result = extract_first_json_object(response_text)
 
-        Document text to analyze:
-        {text[:2000]}  # Limit text to prevent token overflow
-        """
-        
-        try:
-            response = self.model.generate_content(prompt)
-            response_text = response.text.strip()
-            
-            # Clean the response - remove any markdown code blocks
-            if response_text.startswith('```json'):
-                response_text = response_text[7:]
-            if response_text.startswith('```'):
-                response_text = response_text[3:]
-            if response_text.endswith('```'):
-                response_text = response_text[:-3]
-            
-            response_text = response_text.strip()
-            
-            # Try to parse the response as JSON
-            result = json.loads(response_text)
-            
-            # Validate that the result has the expected structure
-            if isinstance(result, dict):
-                return result
-            else:
-                return {
-                    "error": "LLM returned invalid structure",
-                    "fallback_data": template_structure
-                }
-                
-        except json.JSONDecodeError as e:
-            # If JSON parsing fails, try to extract JSON from the response
-            try:
-                # Look for JSON-like content between curly braces
-                import re
-                json_match = re.search(r'\{.*\}', response.text, re.DOTALL)
-                if json_match:
-                    json_str = json_match.group(0)
-                    result = json.loads(json_str)
-                    return result
-                else:
-                    raise json.JSONDecodeError("No JSON found", "", 0)
-            except:
+            if result is None:
                 return {
                     "error": "Failed to parse LLM response as JSON",
-                    "raw_response": response.text[:500] if hasattr(response, 'text') else str(response)[:500],
+                    "raw_response": response_text[:500],
                     "fallback_data": template_structure
                 }
+
+            result, issues = conform_to_template(result, template_structure)
+            if issues:
+                print(f"LLM response did not match the {parsing_type} template: {', '.join(issues[:10])}")
+            return result
+
         except Exception as e:
             return {
                 "error": f"LLM processing error: {str(e)}",
@@ -341,27 +365,13 @@ class OCRService:
 
     def intelligent_document_classification(self, text: str) -> str:
         """Use LLM to classify document type for better parsing"""
-        if not self.model:
+        if not self.llm:
             return "general"
         
-        prompt = f"""
-        Analyze the following text and classify it into exactly one of these document types. 
-        Respond with only the single word classification, nothing else.
-
-        Document types:
-        - invoice (for invoices, receipts, bills, fee receipts)
-        - identity (for ID cards, passports, driver's licenses)
-        - financial (for bank statements, financial reports)
-        - general (for any other document type)
+        prompt = CLASSIFICATION_PROMPT.format(text=text[:500])
 
-        Text to classify:
-        {text[:500]}
-        
-        Classification:"""
-        
         try:
-            response = self.model.generate_content(prompt)
-            classification = response.text.strip().lower()
+            classification = self.llm.generate(prompt).strip().lower()
             
             # Extract just the classification word if there's extra text
             words = classification.split()
@@ -376,56 +386,138 @@ class OCRService:
             print(f"Classification error: {e}")
             return "general"
 
-    async def process_image(self, image_path: str, detect_key_values: bool = True, clean_text: bool = True, use_llm: bool = False) -> Dict[str, Any]:
-        """Process image file and return structured data with direct LLM analysis"""
-        loop = asyncio.get_event_loop()
-        with ThreadPoolExecutor() as executor:
-            raw_text = await loop.run_in_executor(executor, self.extract_text_from_image, image_path)
-        
-        result = {
-            "raw_text": raw_text,
-            "processed_text": self.clean_text(raw_text) if clean_text else raw_text,
-            "text_length": len(raw_text),
-            "processing_timestamp": datetime.utcnow().isoformat()
-        }
-        
-        # Skip traditional parsing, go directly to LLM analysis
-        if raw_text.strip():
-            text_to_analyze = result["processed_text"] if clean_text else raw_text
-            document_type = self.intelligent_document_classification(text_to_analyze)
-            result["llm_analysis"] = {
-                "document_classification": document_type,
-                "structured_data": self.llm_enhanced_parsing(text_to_analyze, document_type)
+    @staticmethod
+    def _ocr_only_analysis(error: str) -> Dict[str, Any]:
+        return {
+            "document_classification": None,
+            "structured_data": {
+                "error": error,
+                "fallback_data": PARSING_TEMPLATES["general"]
             }
-        
-        return result
+        }
 
-    async def process_pdf(self, pdf_path: str, detect_key_values: bool = True, clean_text: bool = True, use_llm: bool = False) -> Dict[str, Any]:
-        """Process PDF file and return structured data with direct LLM analysis"""
-        loop = asyncio.get_event_loop()
-        with ThreadPoolExecutor() as executor:
-            raw_text = await loop.run_in_executor(executor, self.extract_text_from_pdf, pdf_path)
-        
-        result = {
-            "raw_text": raw_text,
-            "processed_text": self.clean_text(raw_text) if clean_text else raw_text,
-            "text_length": len(raw_text),
-            "processing_timestamp": datetime.utcnow().isoformat()
+    async def analyze_with_llm(self, text: str) -> Dict[str, Any]:
+        """Classify and parse text with the LLM under the shared admission limits"""
+        loop = asyncio.get_running_loop()
+        cache = get_result_cache()
+        cache_key = f"llm:{llm_fingerprint()}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+        if cache is not None:
+            # SQLite reads and writes can wait on the other workers' locks
+            cached = await loop.run_in_executor(None, cache.get, cache_key)
+            if cached is not None:
+                return cached
+
+        if self.llm is not None and not self.llm.is_available():
+            # Fail fast with the OCR text only instead of queueing for an LLM that is down
+            return self._ocr_only_analysis("LLM temporarily unavailable, returning OCR text only")
+
+        try:
+            document_type = await admission_controller.run_llm(self.intelligent_document_classification, text)
+            structured_data = await admission_controller.run_llm(self.llm_enhanced_parsing, text, document_type)
+        except AdmissionRejected as e:
+            # The OCR work is already done; return it rather than failing the request
+            return self._ocr_only_analysis(f"{e.detail}, returning OCR text only")
+        analysis = {
+            "document_classification": document_type,
+            "structured_data": structured_data
         }
+        if cache is not None and "error" not in structured_data:
+            await loop.run_in_executor(None, cache.set, cache_key, analysis)
+        return analysis
+
+    def _store_document(self, doc_hash: str, path: str, pages: List[str], filename: Optional[str], file_type: str, result: Dict[str, Any]) -> Optional[str]:
+        """Persist a processed document in the document store, if enabled"""
+        store = get_document_store()
+        if store is None:
+            return None
+
+        try:
+            llm_analysis = result.get("llm_analysis") or {}
+            structured_data = llm_analysis.get("structured_data")
+            # Documents without text have nothing to analyze. A failed analysis has
+            # no fingerprint, so reprocessing retries it
+            analyzed = structured_data is not None and "error" not in structured_data
+            has_text = any(page.strip() for page in pages)
+            with stage("store"):
+                store.save(
+                    doc_hash,
+                    pages,
+                    filename=filename or os.path.basename(path),
+                    file_type=file_type,
+                    language=self.engine.ocr_language or self.language,
+                    document_classification=llm_analysis.get("document_classification"),
+                    structured_data=structured_data,
+                    ocr_fingerprint=self.engine.fingerprint("pdf" if file_type == "PDF" else "image"),
+                    llm_fingerprint=llm_fingerprint() if analyzed or not has_text else None,
+                )
+            return doc_hash
+        except Exception as e:
+            print(f"Warning: could not persist document {filename or path}: {e}")
+            return None
+
+    async def _build_result(self, doc_hash: str, path: str, raw_text: str, pages: List[str], file_type: str, clean_text: bool, filename: Optional[str], text_fields: Optional[Iterable[str]] = None, analyze: bool = True) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        # The cleaning regexes are linear in the text, which is large for long PDFs
+        processed_text = (
+            await loop.run_in_executor(None, contextvars.copy_context().run, self.clean_text, raw_text)
+            if clean_text else raw_text
+        )
+        fields = set(text_fields if text_fields is not None else DEFAULT_TEXT_FIELDS)
+        result = {}
+        if "raw_text" in fields:
+            result["raw_text"] = raw_text
+        if "processed_text" in fields:
+            result["processed_text"] = processed_text
+        if "pages" in fields:
+            result["pages"] = pages
+        result["text_length"] = len(raw_text)
+        result["processing_timestamp"] = datetime.utcnow().isoformat()
+        if self.language == "auto":
+            result["language_detection"] = {
+                "detected_script": self.engine.detected_script,
+                "ocr_language": self.engine.ocr_language
+            }
         
         # Skip traditional parsing, go directly to LLM analysis
-        if raw_text.strip():
-            text_to_analyze = result["processed_text"] if clean_text else raw_text
-            document_type = self.intelligent_document_classification(text_to_analyze)
-            result["llm_analysis"] = {
-                "document_classification": document_type,
-                "structured_data": self.llm_enhanced_parsing(text_to_analyze, document_type)
-            }
+        if analyze and raw_text.strip():
+            result["llm_analysis"] = await self.analyze_with_llm(processed_text)
+
+        stored = await loop.run_in_executor(
+            None, contextvars.copy_context().run, self._store_document, doc_hash, path, pages, filename, file_type, result
+        )
+        if stored:
+            result["document_hash"] = stored
         
         return result
 
+    async def process_image(self, image_path: str, detect_key_values: bool = True, clean_text: bool = True, use_llm: bool = False, filename: Optional[str] = None, text_fields: Optional[Iterable[str]] = None, file_hash: Optional[str] = None, analyze: bool = True) -> Dict[str, Any]:
+        """
+        Process image file and return structured data with direct LLM analysis.
+
+        text_fields selects which of TEXT_FIELDS the result includes (default: raw and processed text).
+        file_hash is the file's SHA-256, if the caller has it already. With
+        analyze=False the LLM analysis is skipped, for callers that run their own.
+        """
+        # Hashed once here; the OCR cache, language detection and the store all key on it
+        file_hash = file_hash or await asyncio.get_running_loop().run_in_executor(None, file_sha256, image_path)
+        raw_text = await admission_controller.run_ocr(self.engine.extract_image_text, image_path, file_hash)
+        file_type = os.path.splitext(filename or image_path)[1][1:].upper() or "IMAGE"
+        return await self._build_result(file_hash, image_path, raw_text, [raw_text], file_type, clean_text, filename, text_fields, analyze)
+
+    async def process_pdf(self, pdf_path: str, detect_key_values: bool = True, clean_text: bool = True, use_llm: bool = False, filename: Optional[str] = None, text_fields: Optional[Iterable[str]] = None, file_hash: Optional[str] = None, analyze: bool = True) -> Dict[str, Any]:
+        """
+        Process PDF file and return structured data with direct LLM analysis.
+
+        text_fields selects which of TEXT_FIELDS the result includes (default: raw and processed text).
+        file_hash is the file's SHA-256, if the caller has it already. With
+        analyze=False the LLM analysis is skipped, for callers that run their own.
+        """
+        file_hash = file_hash or await asyncio.get_running_loop().run_in_executor(None, file_sha256, pdf_path)
+        pages = await admission_controller.run_ocr(self.engine.extract_pdf_pages, pdf_path, file_hash)
+        raw_text = "\n".join(pages).strip()
+        return await self._build_result(file_hash, pdf_path, raw_text, pages, "PDF", clean_text, filename, text_fields, analyze)
+
 # Legacy functions for backward compatibility
 async def extract_text_from_pdf_async(file_path: str) -> str:
     """Legacy function for backward compatibility"""
-    ocr_service = OCRService()
-    return await ocr_service.process_pdf(file_path, detect_key_values=False, clean_text=False)
+    return await OCREngine().extract_pdf_text_async(file_path)
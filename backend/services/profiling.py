@@ -0,0 +1,222 @@
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import get_settings
+
+# Deepest stack recorded per sample; deeper frames are dropped from the root side
+MAX_STACK_DEPTH = 64
+
+
+class RequestProfile:
+    """
+    Stage timings and sampled stacks for one request or CLI run.
+
+    Stacks are collected only from threads while they are inside a stage() of
+    this profile, so concurrent requests sharing the executors do not show up
+    in each other's profiles.
+    """
+
+    def __init__(self, label: str, sample_interval: float):
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", label).strip("-").lower() or "profile"
+        self.profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{slug[:40]}-{uuid.uuid4().hex[:6]}"
+        self.label = label
+        self.sample_interval = sample_interval
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.wall_seconds: Optional[float] = None
+        self.stacks: Counter = Counter()
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.lock = threading.Lock()
+
+    def add_sample(self, stack: Tuple[str, ...]):
+        with self.lock:
+            self.stacks[stack] += 1
+
+    def record_stage(self, name: str, seconds: float):
+        with self.lock:
+            entry = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0})
+            entry["seconds"] += seconds
+            entry["calls"] += 1
+
+    def finish(self):
+        self.wall_seconds = time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        """Stage durations as a Server-Timing header value"""
+        with self.lock:
+            return ", ".join(
+                f"{name};dur={entry['seconds'] * 1000:.1f}" for name, entry in self.stages.items()
+            )
+
+    def collapsed_stacks(self) -> str:
+        """Samples in the folded format read by flamegraph.pl, speedscope and inferno"""
+        with self.lock:
+            return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self, top: int = 15) -> Dict[str, Any]:
+        with self.lock:
+            total_samples = sum(self.stacks.values())
+            stage_samples: Counter = Counter()
+            leaf_samples: Counter = Counter()
+            for stack, count in self.stacks.items():
+                stage_samples[stack[0]] += count
+                leaf_samples[stack[-1]] += count
+            stages = {
+                name: {
+                    "seconds": round(entry["seconds"], 4),
+                    "calls": entry["calls"],
+                    "samples": stage_samples.get(f"stage:{name}", 0),
+                }
+                for name, entry in sorted(self.stages.items(), key=lambda item: -item[1]["seconds"])
+            }
+
+        return {
+            "profile_id": self.profile_id,
+            "label": self.label,
+            "started_at": self.started_at,
+            "wall_seconds": round(self.wall_seconds, 4) if self.wall_seconds is not None else None,
+            "sample_interval_ms": round(self.sample_interval * 1000, 2),
+            "samples": total_samples,
+            # Stage seconds are summed over threads, so parallel page OCR can exceed wall time
+            "stages": stages,
+            "top_functions": [
+                {"function": frame, "self_samples": count, "share": round(count / total_samples, 4)}
+                for frame, count in leaf_samples.most_common(top)
+            ],
+        }
+
+    def write(self, directory: str) -> Dict[str, str]:
+        """Write <id>.folded and <id>.json to directory and return their paths"""
+        os.makedirs(directory, exist_ok=True)
+        folded_path = os.path.join(directory, f"{self.profile_id}.folded")
+        summary_path = os.path.join(directory, f"{self.profile_id}.json")
+        with open(folded_path, "w", encoding="utf-8") as f:
+            f.write(self.collapsed_stacks())
+        summary = self.summary()
+        summary["flamegraph"] = folded_path
+        with open(summary_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        return {"flamegraph": folded_path, "summary": summary_path}
+
+
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("documend_profile", default=None)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class _Sampler:
+    """
+    One background thread sampling the stacks of threads inside a profiled stage.
+
+    It runs only while at least one profile is active.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active_profiles = 0
+        self.interval = 0.005
+        # thread id -> stack of (profile, stage name) entered on that thread
+        self.threads: Dict[int, List[Tuple[RequestProfile, str]]] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def begin(self, interval: float):
+        with self.lock:
+            self.active_profiles += 1
+            self.interval = interval
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+                self._thread.start()
+
+    def end(self):
+        with self.lock:
+            self.active_profiles -= 1
+
+    def enter(self, profile: RequestProfile, name: str):
+        with self.lock:
+            self.threads.setdefault(threading.get_ident(), []).append((profile, name))
+
+    def exit(self):
+        thread_id = threading.get_ident()
+        with self.lock:
+            entries = self.threads.get(thread_id)
+            if entries:
+                entries.pop()
+                if not entries:
+                    del self.threads[thread_id]
+
+    def _run(self):
+        while True:
+            with self.lock:
+                if self.active_profiles <= 0:
+                    self._thread = None
+                    return
+                interval = self.interval
+                targets = [(thread_id, entries[-1]) for thread_id, entries in self.threads.items()]
+
+            if targets:
+                frames = sys._current_frames()
+                for thread_id, (profile, name) in targets:
+                    frame = frames.get(thread_id)
+                    stack = []
+                    while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                        stack.append(_frame_label(frame))
+                        frame = frame.f_back
+                    stack.append(f"stage:{name}")
+                    profile.add_sample(tuple(reversed(stack)))
+                del frames
+            time.sleep(interval)
+
+
+_sampler = _Sampler()
+
+
+def current_profile() -> Optional[RequestProfile]:
+    return _current_profile.get()
+
+
+@contextmanager
+def profile_request(label: str, sample_interval: Optional[float] = None):
+    """Profile everything run inside this block, including executor work that inherits the context"""
+    interval = sample_interval or get_settings().profile_sample_interval
+    profile = RequestProfile(label, interval)
+    token = _current_profile.set(profile)
+    _sampler.begin(interval)
+    try:
+        yield profile
+    finally:
+        profile.finish()
+        _sampler.end()
+        _current_profile.reset(token)
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Time a pipeline stage (rasterize, ocr, clean, llm, ...) for the current profile.
+
+    Does nothing unless a profile is active in the calling context.
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+
+    _sampler.enter(profile, name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.record_stage(name, time.perf_counter() - started)
+        _sampler.exit()
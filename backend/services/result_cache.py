@@ -0,0 +1,106 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from itertools import count
+from typing import Any, Optional
+
+from config import get_settings
+
+
+class ResultCache:
+    """
+    SQLite-backed result cache shared by every worker process on the host.
+
+    WAL mode lets readers in one worker proceed while another worker writes,
+    so a document processed once is not processed again by a sibling worker.
+    """
+
+    EVICT_EVERY = 100
+
+    def __init__(self, path: str, ttl_seconds: float = 0, max_entries: int = 10000):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._writes = count(1)
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " created REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS results_created ON results (created)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            row = self._connect().execute(
+                "SELECT value, created FROM results WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Warning: result cache read failed: {e}")
+            return None
+
+        if row is None or (self.ttl_seconds and time.time() - row[1] > self.ttl_seconds):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any):
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO results (key, value, created) VALUES (?, ?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False), time.time()),
+                )
+                # Evicting scans the table, so it runs every EVICT_EVERY writes; the table
+                # may briefly exceed its bound by that many entries per worker
+                if self.max_entries and next(self._writes) % self.EVICT_EVERY == 0:
+                    conn.execute(
+                        "DELETE FROM results WHERE key IN ("
+                        " SELECT key FROM results ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                        (self.max_entries,),
+                    )
+        except sqlite3.Error as e:
+            print(f"Warning: result cache write failed: {e}")
+
+    def metrics(self) -> dict:
+        return {"path": self.path, "hits": self.hits, "misses": self.misses}
+
+
+_result_cache: Optional[ResultCache] = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """Return the process-wide result cache, or None if caching is disabled"""
+    global _result_cache
+    settings = get_settings()
+    if not settings.result_cache_enabled:
+        return None
+    if _result_cache is None:
+        with _result_cache_lock:
+            if _result_cache is None:
+                _result_cache = ResultCache(
+                    settings.result_cache_path,
+                    ttl_seconds=settings.result_cache_ttl,
+                    max_entries=settings.result_cache_max_entries,
+                )
+    return _result_cache
@@ -0,0 +1,55 @@
+import time
+from typing import Any, Dict
+
+# Readiness state for this worker process, reported by /ready
+warmup_state: Dict[str, Any] = {
+    "ready": False,
+    "duration_seconds": None,
+    "errors": [],
+}
+
+
+def warm_up() -> Dict[str, Any]:
+    """
+    Pre-load the OCR engine and LLM client so the first request doesn't pay for it.
+
+    Runs once per worker process after it starts. Failures are recorded but do
+    not block readiness; the affected stage reports the error on first use as
+    it did before.
+    """
+    started = time.monotonic()
+    errors = []
+
+    try:
+        from PIL import Image
+        import pytesseract
+        from services.ocr_engine import installed_languages, tesseract_version
+        from services.ocr_service import OCRService
+
+        service = OCRService()
+        installed_languages()
+        tesseract_version()
+        # A tiny OCR run pages the tesseract binary and traineddata into memory
+        pytesseract.image_to_string(Image.new("L", (64, 32), color=255), lang=service.language)
+    except Exception as e:
+        errors.append(f"ocr: {e}")
+
+    try:
+        import pdf2image  # noqa: F401
+    except Exception as e:
+        errors.append(f"pdf2image: {e}")
+
+    try:
+        from services.result_cache import get_result_cache
+        get_result_cache()
+    except Exception as e:
+        errors.append(f"result_cache: {e}")
+
+    for error in errors:
+        print(f"Warning: warm-up step failed: {error}")
+
+    warmup_state["errors"] = errors
+    warmup_state["duration_seconds"] = round(time.monotonic() - started, 3)
+    warmup_state["ready"] = True
+    print(f"Worker warm-up finished in {warmup_state['duration_seconds']}s")
+    return warmup_state
@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+from services import admission
+from services.admission import AdmissionRejected, StageLimiter, TokenBucket
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(admission.time, "monotonic", clock)
+    return clock
+
+
+def test_bucket_serves_a_burst_then_waits(clock):
+    bucket = TokenBucket(rate_per_second=2.0, capacity=3)
+
+    assert [bucket.reserve(max_wait=0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    # The next token is half a second away at 2 tokens per second
+    assert bucket.reserve(max_wait=0) is None
+    assert bucket.reserve(max_wait=1) == pytest.approx(0.5)
+
+
+def test_bucket_balance_goes_negative_for_reserved_waits(clock):
+    bucket = TokenBucket(rate_per_second=1.0, capacity=1)
+
+    assert bucket.reserve(max_wait=5) == 0.0
+    assert bucket.reserve(max_wait=5) == pytest.approx(1.0)
+    # The previous reservation is owed, so the next caller queues behind it
+    assert bucket.reserve(max_wait=5) == pytest.approx(2.0)
+    assert bucket.tokens == pytest.approx(-2.0)
+    assert bucket.time_until_available() == pytest.approx(3.0)
+
+
+def test_bucket_refills_up_to_capacity(clock):
+    bucket = TokenBucket(rate_per_second=1.0, capacity=2)
+    bucket.reserve(max_wait=0)
+    bucket.reserve(max_wait=0)
+
+    clock.now += 1.5
+    assert bucket.time_until_available() == 0.0
+    clock.now += 100
+    bucket.reserve(max_wait=0)
+    assert bucket.tokens == pytest.approx(1.0)
+
+
+def test_limiter_rejects_when_queue_is_full():
+    async def scenario():
+        limiter = StageLimiter("ocr", limit=1, max_queue=1, max_wait=5)
+        release = asyncio.Event()
+
+        async def hold():
+            async with limiter.slot():
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        assert limiter.in_flight == 1
+        assert limiter.waiting == 1
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            async with limiter.slot():
+                pass
+        release.set()
+        await asyncio.gather(holder, waiter)
+        return limiter, rejected.value
+
+    limiter, rejected = asyncio.run(scenario())
+    assert rejected.status_code == 503
+    assert rejected.stage == "ocr"
+    assert rejected.retry_after >= 1
+    assert limiter.rejected == 1
+    assert limiter.admitted == 2
+    assert limiter.max_queue_depth == 1
+
+
+def test_limiter_times_out_waiting_for_a_slot():
+    async def scenario():
+        limiter = StageLimiter("llm", limit=1, max_queue=4, max_wait=0.05)
+        limiter.avg_service_time = 2.0
+        release = asyncio.Event()
+
+        async def hold():
+            async with limiter.slot():
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        try:
+            with pytest.raises(AdmissionRejected) as rejected:
+                async with limiter.slot():
+                    pass
+        finally:
+            release.set()
+            await holder
+        return limiter, rejected.value
+
+    limiter, rejected = asyncio.run(scenario())
+    assert "Timed out" in rejected.detail
+    # Retry-After estimates the queue ahead from the average time a slot is held
+    assert rejected.retry_after == 2
+    assert limiter.waiting == 0
+    assert limiter.rejected == 1
@@ -0,0 +1,75 @@
+import pytest
+
+from services.document_store import DocumentStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return DocumentStore(str(tmp_path / "documents.sqlite3"))
+
+
+def hashes(results):
+    return [(result["document_hash"], result["page_number"]) for result in results]
+
+
+def test_save_and_get(store):
+    store.save(
+        "a" * 64, ["Invoice 42", "Total due 10.00"], filename="a.pdf", file_type="PDF",
+        document_classification="invoice", structured_data={"totals": {"total": "10.00"}},
+    )
+
+    document = store.get("a" * 64)
+    assert document["document_hash"] == "a" * 64
+    assert document["pages"] == ["Invoice 42", "Total due 10.00"]
+    assert document["page_count"] == 2
+    assert document["structured_data"] == {"totals": {"total": "10.00"}}
+    assert store.get("a" * 64, include_pages=False).get("pages") is None
+    assert store.get("missing") is None
+
+
+def test_search_finds_pages_with_all_terms(store):
+    store.save("a", ["invoice from ACME", "total due"], filename="a.pdf")
+    store.save("b", ["ACME passport"], filename="b.png")
+
+    assert hashes(store.search("acme invoice")) == [("a", 1)]
+    assert sorted(hashes(store.search("acme"))) == [("a", 1), ("b", 1)]
+    result = store.search("due")[0]
+    assert result["filename"] == "a.pdf"
+    assert "[due]" in result["snippet"]
+    assert store.search("   ") == []
+    # Terms are matched literally, not as FTS5 query syntax
+    assert store.search('"total" OR') == []
+
+
+def test_replacing_a_document_replaces_its_index_entries(store):
+    store.save("a", ["old text", "second page"])
+    store.save("b", ["old text elsewhere"])
+    store.save("a", ["new text"])
+
+    assert hashes(store.search("old")) == [("b", 1)]
+    assert hashes(store.search("new")) == [("a", 1)]
+    assert store.search("second") == []
+    assert store.stats()["pages"] == 2
+
+
+def test_replacing_keeps_the_analysis_unless_given(store):
+    store.save("a", ["text"], document_classification="invoice", structured_data={"x": 1}, llm_fingerprint="llm1")
+    store.save("a", ["text again"], ocr_fingerprint="ocr2")
+
+    document = store.get("a")
+    assert document["structured_data"] == {"x": 1}
+    assert document["llm_fingerprint"] == "llm1"
+    assert document["ocr_fingerprint"] == "ocr2"
+
+
+def test_index_survives_vacuum(store):
+    for number in range(5):
+        store.save(f"doc{number}", [f"page of document {number}", "filler"])
+    for number in range(4):
+        store.save(f"doc{number}", [f"replaced {number}"])
+
+    conn = store._connect()
+    conn.execute("VACUUM")
+
+    assert hashes(store.search("document")) == [("doc4", 1)]
+    assert hashes(store.search("replaced 2")) == [("doc2", 1)]
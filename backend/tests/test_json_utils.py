@@ -0,0 +1,63 @@
+from utils.json_utils import conform_to_template, extract_first_json_object
+
+TEMPLATE = {
+    "document_type": "invoice/receipt",
+    "vendor_info": {"name": "", "phone": ""},
+    "line_items": [],
+    "totals": {"total": ""},
+}
+
+
+def test_extracts_plain_json():
+    assert extract_first_json_object('{"a": 1}') == {"a": 1}
+
+
+def test_extracts_json_from_fences_and_prose():
+    text = 'Here is the result:\n```json\n{"a": {"b": "x}"}}\n```\nHope this helps {not json}'
+    assert extract_first_json_object(text) == {"a": {"b": "x}"}}
+
+
+def test_skips_candidates_that_do_not_parse():
+    assert extract_first_json_object('{oops} then {"ok": true}') == {"ok": True}
+
+
+def test_braces_inside_strings_and_escapes():
+    text = 'prefix {"quote": "she said \\"{hi}\\"", "n": 2} suffix'
+    assert extract_first_json_object(text) == {"quote": 'she said "{hi}"', "n": 2}
+
+
+def test_no_json_object():
+    assert extract_first_json_object("") is None
+    assert extract_first_json_object("[1, 2, 3]") is None
+    assert extract_first_json_object('{"unterminated": 1') is None
+
+
+def test_conform_fills_missing_keys_and_keeps_extras():
+    data, issues = conform_to_template({"vendor_info": {"name": "ACME"}, "notes": "extra"}, TEMPLATE)
+
+    assert data["vendor_info"] == {"name": "ACME", "phone": ""}
+    assert data["line_items"] == []
+    assert data["totals"] == {"total": ""}
+    assert data["notes"] == "extra"
+    assert "vendor_info.phone: missing" in issues
+    assert "totals: missing" in issues
+
+
+def test_conform_coerces_wrong_types():
+    data, issues = conform_to_template(
+        {"document_type": None, "vendor_info": "ACME", "line_items": {"item": "x"}, "totals": {"total": 42.5}},
+        TEMPLATE,
+    )
+
+    assert data["document_type"] == ""
+    assert data["vendor_info"] == {"name": "", "phone": ""}
+    assert data["line_items"] == [{"item": "x"}]
+    assert data["totals"]["total"] == "42.5"
+    assert "vendor_info: expected object" in issues
+    assert "line_items: expected array" in issues
+
+
+def test_conform_does_not_share_template_defaults():
+    data, _ = conform_to_template({}, TEMPLATE)
+    data["vendor_info"]["name"] = "changed"
+    assert TEMPLATE["vendor_info"]["name"] == ""
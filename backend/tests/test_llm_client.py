@@ -0,0 +1,129 @@
+from types import SimpleNamespace
+
+import pytest
+
+from services import llm_client
+from services.llm_client import CircuitBreaker, LLMClient, LLMUnavailable
+
+
+class ServiceUnavailable(Exception):
+    code = 503
+
+
+class StubModel:
+    """Stands in for genai.GenerativeModel, returning or raising queued outcomes"""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return SimpleNamespace(text=outcome)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_client.time, "monotonic", clock)
+    monkeypatch.setattr(llm_client.time, "sleep", lambda seconds: None)
+    return clock
+
+
+def make_client(outcomes, breaker=None, **kwargs):
+    options = {"timeout": 30.0, "max_retries": 3, "backoff_base": 0.5, "backoff_max": 8.0}
+    options.update(kwargs)
+    client = LLMClient(settings=None, breaker=breaker or CircuitBreaker(min_calls=100), **options)
+    client._model = StubModel(outcomes)
+    return client
+
+
+def test_transient_errors_are_retried(clock):
+    client = make_client([ServiceUnavailable(), ServiceUnavailable(), "ok"])
+
+    assert client.generate("prompt") == "ok"
+    assert client._model.calls == 3
+    assert client.counts["retries"] == 2
+    assert client.counts["successes"] == 1
+
+
+def test_non_transient_errors_are_not_retried(clock):
+    client = make_client([ValueError("bad request"), "ok"])
+
+    with pytest.raises(ValueError):
+        client.generate("prompt")
+    assert client._model.calls == 1
+
+
+def test_retries_are_exhausted(clock):
+    client = make_client([ServiceUnavailable()] * 3, max_retries=2)
+
+    with pytest.raises(LLMUnavailable):
+        client.generate("prompt")
+    assert client._model.calls == 3
+
+
+def test_retries_reserve_from_the_rate_budget(clock):
+    reserved = []
+    client = make_client([ServiceUnavailable(), "ok"], reserve_call=lambda max_wait: reserved.append(max_wait) or 0.0)
+    assert client.generate("prompt") == "ok"
+    assert len(reserved) == 1
+
+    client = make_client([ServiceUnavailable(), "ok"], reserve_call=lambda max_wait: None)
+    with pytest.raises(LLMUnavailable):
+        client.generate("prompt")
+    assert client._model.calls == 1
+    assert client.counts["retries_rate_limited"] == 1
+
+
+def test_circuit_opens_probes_and_closes(clock):
+    breaker = CircuitBreaker(failure_rate=0.5, min_calls=4, window=60.0, cooldown=30.0)
+    client = make_client([ServiceUnavailable()] * 4 + ["recovered"], breaker=breaker, max_retries=0)
+
+    for _ in range(4):
+        with pytest.raises(LLMUnavailable):
+            client.generate("prompt")
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not client.is_available()
+
+    # Open: calls fail fast without reaching the model
+    with pytest.raises(LLMUnavailable) as rejected:
+        client.generate("prompt")
+    assert client._model.calls == 4
+    assert rejected.value.retry_after == pytest.approx(30.0)
+
+    # After the cooldown one probe goes through and its success closes the circuit
+    clock.now += 31
+    assert client.is_available()
+    assert client.generate("prompt") == "recovered"
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.transitions == {"closed->open": 1, "open->half_open": 1, "half_open->closed": 1}
+
+
+def test_failed_probe_reopens_the_circuit(clock):
+    breaker = CircuitBreaker(failure_rate=0.5, min_calls=2, window=60.0, cooldown=30.0)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record(False)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    clock.now += 31
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Only one probe at a time
+    assert not breaker.allow()
+
+    breaker.record(False)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
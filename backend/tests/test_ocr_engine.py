@@ -0,0 +1,74 @@
+import pytest
+
+from services.ocr_engine import (
+    DEFAULT_DPI, DENSE_TEXT_DPI, MAX_PAGE_PIXELS, MIN_DPI, PROBE_DPI, choose_page_dpi, measure_probe,
+)
+
+Image = pytest.importorskip("PIL.Image")
+ImageDraw = pytest.importorskip("PIL.ImageDraw")
+ImageFont = pytest.importorskip("PIL.ImageFont")
+
+# US Letter, drawn at 300 DPI and downsampled to the probe the way pdftoppm renders it
+PAGE_INCHES = (8.5, 11)
+RENDER_DPI = 300
+LINE = "Invoice 10293 total amount due 1,284.50 tax 96.34 date 2024-03-18 the quick brown fox"
+
+
+def text_page(points: float, lines=None):
+    width, height = (int(side * RENDER_DPI) for side in PAGE_INCHES)
+    page = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(page)
+    size = int(points * RENDER_DPI / 72)
+    font = ImageFont.load_default(size=size)
+    y, count = RENDER_DPI // 2, 0
+    while y < height - RENDER_DPI // 2 and (lines is None or count < lines):
+        x = RENDER_DPI // 2
+        while x < width - RENDER_DPI // 2:
+            draw.text((x, y), LINE, font=font, fill=0)
+            x += int(draw.textlength(LINE + " ", font=font))
+        y += int(size * 1.2)
+        count += 1
+    return page
+
+
+def flat_page(level: int):
+    return Image.new("L", tuple(int(side * RENDER_DPI) for side in PAGE_INCHES), level)
+
+
+def probe_dpi(page) -> int:
+    probe = page.resize(tuple(int(side * PROBE_DPI) for side in PAGE_INCHES), Image.BOX)
+    return choose_page_dpi(*PAGE_INCHES, *measure_probe(probe))
+
+
+def test_blank_page_gets_min_dpi():
+    assert probe_dpi(flat_page(255)) == MIN_DPI
+
+
+def test_small_print_gets_dense_dpi():
+    assert probe_dpi(text_page(6)) == DENSE_TEXT_DPI
+    assert probe_dpi(text_page(8)) == DENSE_TEXT_DPI
+    # A few lines of small print are not mistaken for a blank page
+    assert probe_dpi(text_page(6, lines=3)) == DENSE_TEXT_DPI
+
+
+def test_regular_text_gets_default_dpi():
+    assert probe_dpi(text_page(12, lines=45)) == DEFAULT_DPI
+    assert probe_dpi(text_page(12, lines=5)) == DEFAULT_DPI
+    assert probe_dpi(text_page(24)) == DEFAULT_DPI
+
+
+def test_flat_grey_pages_are_not_small_print():
+    assert probe_dpi(flat_page(200)) == DEFAULT_DPI
+    assert probe_dpi(flat_page(90)) == DEFAULT_DPI
+
+
+def test_inked_pages_never_go_below_default_dpi():
+    assert choose_page_dpi(8.5, 11, ink_ratio=0.01, dark_ratio=0.5, edge_ratio=1.0) == DEFAULT_DPI
+    assert choose_page_dpi(8.5, 11, ink_ratio=1.0, dark_ratio=0.0, edge_ratio=0.0) == DEFAULT_DPI
+
+
+def test_pixel_cap_wins():
+    # A 100 x 60 inch banner: the cap is below every other limit
+    dpi = choose_page_dpi(100, 60, ink_ratio=0.3, dark_ratio=0.01, edge_ratio=1.0)
+    assert dpi < MIN_DPI
+    assert 100 * 60 * dpi * dpi <= MAX_PAGE_PIXELS
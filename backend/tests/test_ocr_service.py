@@ -0,0 +1,46 @@
+from services import ocr_service
+from services.ocr_service import OCRService
+
+
+class StubLLM:
+    """Stands in for the shared LLMClient, returning queued responses"""
+
+    timeout = 30.0
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.prompts = []
+
+    def generate(self, prompt, json_mode=False, timeout=None):
+        self.prompts.append(prompt)
+        return self.responses.pop(0)
+
+
+def make_service(responses):
+    service = OCRService.__new__(OCRService)
+    service.llm = StubLLM(responses)
+    return service
+
+
+def test_invalid_json_is_repaired_within_the_rate_budget(monkeypatch):
+    reserved = []
+    monkeypatch.setattr(
+        ocr_service.admission_controller, "reserve_llm_call", lambda max_wait: reserved.append(max_wait) or 0.0
+    )
+    service = make_service(["not json", '{"document_type": "invoice/receipt"}'])
+
+    result = service.llm_enhanced_parsing("text", "invoice")
+
+    assert result["document_type"] == "invoice/receipt"
+    assert len(service.llm.prompts) == 2
+    assert len(reserved) == 1
+
+
+def test_repair_is_skipped_when_the_rate_budget_is_spent(monkeypatch):
+    monkeypatch.setattr(ocr_service.admission_controller, "reserve_llm_call", lambda max_wait: None)
+    service = make_service(["not json", '{"document_type": "invoice/receipt"}'])
+
+    result = service.llm_enhanced_parsing("text", "invoice")
+
+    assert result["error"] == "Failed to parse LLM response as JSON"
+    assert len(service.llm.prompts) == 1
@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+
+import cli_ocr
+from services import document_store, ocr_service
+from services.document_store import DocumentStore
+
+
+class Config:
+    ocr = "ocr-v1"
+    llm = "llm-v1"
+
+
+class StubEngine:
+    def resolve_language(self, kind, path, image_paths=None, file_hash=None):
+        return "eng"
+
+    def fingerprint(self, kind):
+        return Config.ocr
+
+
+class StubOCRService:
+    """Records which stages run; processing stores the document like OCRService does"""
+
+    calls = []
+    store = None
+
+    def __init__(self, language="auto"):
+        self.engine = StubEngine()
+
+    async def process_pdf(self, path, clean_text=True, filename=None, text_fields=None, file_hash=None):
+        self.calls.append(("ocr", filename))
+        analysis = await self.analyze_with_llm("text")
+        self.store.save(
+            file_hash, ["text"], filename=filename, structured_data=analysis["structured_data"],
+            ocr_fingerprint=Config.ocr, llm_fingerprint=Config.llm,
+        )
+
+    process_image = process_pdf
+
+    async def analyze_with_llm(self, text):
+        self.calls.append(("llm", text))
+        return {"document_classification": "general", "structured_data": {"summary": text}}
+
+    def clean_text(self, text):
+        return text
+
+
+@pytest.fixture
+def setup(tmp_path, monkeypatch):
+    store = DocumentStore(str(tmp_path / "documents.sqlite3"))
+    StubOCRService.calls = []
+    StubOCRService.store = store
+    Config.ocr, Config.llm = "ocr-v1", "llm-v1"
+    monkeypatch.setattr(cli_ocr, "load_ocr_service", lambda: StubOCRService)
+    monkeypatch.setattr(document_store, "get_document_store", lambda: store)
+    monkeypatch.setattr(ocr_service, "llm_fingerprint", lambda: Config.llm)
+
+    source = tmp_path / "scan.pdf"
+    source.write_bytes(b"%PDF-1.4 scan")
+    return store, str(source)
+
+
+def run(paths):
+    StubOCRService.calls = []
+    return asyncio.run(cli_ocr.reprocess(paths))
+
+
+def stages():
+    return [stage for stage, _ in StubOCRService.calls]
+
+
+def test_new_documents_run_both_stages_then_are_up_to_date(setup):
+    store, source = setup
+
+    assert run([source])["ocr_and_llm"] == 1
+    assert stages() == ["ocr", "llm"]
+
+    assert run([source])["up_to_date"] == 1
+    assert stages() == []
+
+
+def test_changed_llm_fingerprint_reruns_only_the_llm(setup):
+    store, source = setup
+    run([source])
+
+    Config.llm = "llm-v2"
+    counts = run([source])
+    assert counts["llm_only"] == 1
+    assert stages() == ["llm"]
+    assert store.stale_llm_documents("llm-v2") == []
+
+
+def test_changed_ocr_fingerprint_reruns_both_stages(setup):
+    store, source = setup
+    run([source])
+
+    Config.ocr = "ocr-v2"
+    counts = run([source])
+    assert counts["ocr_and_llm"] == 1
+    assert stages() == ["ocr", "llm"]
+
+
+def test_stored_documents_without_source_refresh_only_the_llm(setup):
+    store, source = setup
+    run([source])
+
+    Config.ocr, Config.llm = "ocr-v2", "llm-v2"
+    counts = run([])
+    assert counts["llm_only"] == 1
+    assert stages() == ["llm"]
+
+
+def test_documents_without_text_are_not_stale_again(setup):
+    store, source = setup
+    store.save("empty", [""], ocr_fingerprint=Config.ocr)
+
+    Config.llm = "llm-v2"
+    run([])
+    assert store.stale_llm_documents("llm-v2") == []
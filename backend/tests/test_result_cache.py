@@ -0,0 +1,25 @@
+from services.result_cache import ResultCache
+
+
+def test_round_trip_and_hit_counts(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache.sqlite3"))
+
+    assert cache.get("missing") is None
+    cache.set("key", {"text": "héllo"})
+    assert cache.get("key") == {"text": "héllo"}
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_evicts_oldest_entries_periodically(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache.sqlite3"), max_entries=10)
+    cache.EVICT_EVERY = 5
+
+    for i in range(14):
+        cache.set(f"key{i}", i)
+    # No eviction since the 10th write
+    assert cache.get("key0") == 0
+
+    cache.set("key14", 14)
+    assert cache.get("key4") is None
+    assert cache.get("key5") == 5
+    assert cache.get("key14") == 14
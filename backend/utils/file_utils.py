@@ -1,6 +1,8 @@
 import os
 import shutil
+import tempfile
 from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
 
 UPLOAD_DIR = "uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
@@ -10,3 +12,16 @@ async def save_upload_file(upload_file: UploadFile) -> str:
     with open(filename, "wb") as buffer:
         shutil.copyfileobj(upload_file.file, buffer)
     return filename
+
+
+def _write_temp_file(content: bytes, suffix: str) -> str:
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
+        tmp_file.write(content)
+        return tmp_file.name
+
+
+async def save_upload_to_temp(upload_file: UploadFile, suffix: str) -> str:
+    """Write an upload to a temporary file off the event loop and return its path"""
+    content = await upload_file.read()
+    return await run_in_threadpool(_write_temp_file, content, suffix)
+
@@ -0,0 +1,10 @@
+import hashlib
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Return the hex SHA-256 digest of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
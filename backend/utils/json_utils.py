@@ -0,0 +1,129 @@
+import copy
+import hashlib
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def iter_json_object_candidates(text: str):
+    """Yield balanced {...} substrings of text in order of their opening brace.
+
+    The scan tracks string literals and escapes so braces inside JSON strings
+    do not affect nesting. Each candidate is yielded as soon as its closing
+    brace is seen, so callers can stop at the first one that parses.
+    """
+    start = text.find("{")
+    while start != -1:
+        depth = 0
+        in_string = False
+        escaped = False
+        end = -1
+        for i in range(start, len(text)):
+            char = text[i]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif char == "\\":
+                    escaped = True
+                elif char == '"':
+                    in_string = False
+                continue
+            if char == '"':
+                in_string = True
+            elif char == "{":
+                depth += 1
+            elif char == "}":
+                depth -= 1
+                if depth == 0:
+                    end = i
+                    break
+        if end == -1:
+            # Unterminated object; nothing after this brace can balance either
+            return
+        yield text[start:end + 1]
+        start = text.find("{", start + 1)
+
+
+def extract_first_json_object(text: str) -> Optional[Dict[str, Any]]:
+    """Return the first balanced JSON object in text that parses, or None"""
+    if not text:
+        return None
+
+    stripped = text.strip()
+    if stripped.startswith("{"):
+        try:
+            result = json.loads(stripped)
+            if isinstance(result, dict):
+                return result
+        except json.JSONDecodeError:
+            pass
+
+    for candidate in iter_json_object_candidates(text):
+        try:
+            result = json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(result, dict):
+            return result
+    return None
+
+
+def _coerce_to_template(value: Any, template: Any, path: str, issues: List[str]) -> Any:
+    if isinstance(template, dict):
+        if not isinstance(value, dict):
+            issues.append(f"{path or '<root>'}: expected object")
+            return copy.deepcopy(template)
+        return _conform_dict(value, template, path, issues)
+
+    if isinstance(template, list):
+        if isinstance(value, list):
+            return value
+        issues.append(f"{path}: expected array")
+        if value in (None, ""):
+            return []
+        return [value]
+
+    if isinstance(template, str):
+        if isinstance(value, str):
+            return value
+        if value is None:
+            return ""
+        if isinstance(value, (int, float, bool)):
+            return str(value)
+        issues.append(f"{path}: expected string")
+        return json.dumps(value, ensure_ascii=False)
+
+    return value
+
+
+def _conform_dict(data: Dict[str, Any], template: Dict[str, Any], path: str, issues: List[str]) -> Dict[str, Any]:
+    result = {}
+    for key, default in template.items():
+        key_path = f"{path}.{key}" if path else key
+        if key not in data:
+            issues.append(f"{key_path}: missing")
+            result[key] = copy.deepcopy(default)
+        else:
+            result[key] = _coerce_to_template(data[key], default, key_path, issues)
+
+    # Keep any extra keys the model returned; they are often useful
+    for key, value in data.items():
+        if key not in result:
+            result[key] = value
+    return result
+
+
+def conform_to_template(data: Dict[str, Any], template: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Validate data against a template structure.
+
+    Missing keys are filled from the template and values of the wrong type are
+    coerced where possible. Returns the conformed data and a list of issues.
+    """
+    issues: List[str] = []
+    return _coerce_to_template(data, template, "", issues), issues
+
+
+def fingerprint(value: Any) -> str:
+    """Short stable hash of a JSON-serializable value, independent of key order"""
+    canonical = json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
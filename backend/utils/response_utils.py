@@ -0,0 +1,93 @@
+import gzip
+import json
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+
+from config import get_settings
+
+# orjson and zstandard are optional; without them responses fall back to the
+# standard json module and gzip
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+GZIP_LEVEL = 5
+ZSTD_LEVEL = 3
+
+
+def dumps(payload: Any) -> bytes:
+    """Serialize a response payload to UTF-8 JSON bytes"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(payload)
+        except TypeError:
+            # e.g. integers beyond 64 bits; the json module handles these
+            pass
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick zstd or gzip from an Accept-Encoding header, or None for identity"""
+    accepted: Dict[str, float] = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name] = quality
+
+    def allowed(name: str) -> bool:
+        return accepted.get(name, accepted.get("*", 0.0)) > 0
+
+    if zstandard is not None and allowed("zstd"):
+        return "zstd"
+    if allowed("gzip"):
+        return "gzip"
+    return None
+
+
+def encode_body(payload: Any, encoding: Optional[str], min_bytes: int) -> Tuple[bytes, Optional[str]]:
+    """Serialize and, if worthwhile, compress a payload; returns the body and the encoding applied"""
+    body = dumps(payload)
+    if encoding is None or len(body) < min_bytes:
+        return body, None
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body), "zstd"
+    return gzip.compress(body, compresslevel=GZIP_LEVEL), "gzip"
+
+
+def build_json_response(payload: Any, accept_encoding: str = "", status_code: int = 200) -> Response:
+    """
+    Serialize a payload straight to a compressed JSON response.
+
+    Skips FastAPI's jsonable_encoder pass, which copies the whole payload, and
+    compresses only bodies of at least RESPONSE_COMPRESSION_MIN_BYTES.
+    """
+    settings = get_settings()
+    encoding = choose_encoding(accept_encoding) if settings.response_compression else None
+    body, applied = encode_body(payload, encoding, settings.response_compression_min_bytes)
+    headers = {"Vary": "Accept-Encoding"}
+    if applied:
+        headers["Content-Encoding"] = applied
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
+
+
+async def json_response(request: Request, payload: Any, status_code: int = 200) -> Response:
+    """build_json_response for async routes; serialization and compression run off the event loop"""
+    return await run_in_threadpool(
+        build_json_response, payload, request.headers.get("accept-encoding", ""), status_code
+    )